@@ -0,0 +1,18 @@
+"""Markdown to LaTeX conversion for the informe_final documents.
+
+One engine drives every document; the differences between chapters and
+annexes live in the profiles registered in :mod:`mdtex.profiles`. Markdown
+is parsed into the nodes of :mod:`mdtex.ir`, which the renderers in
+:mod:`mdtex.backends` turn into LaTeX, plain text or JSON.
+"""
+
+from .engine import Parser, convert, convert_file, iter_convert, parse, render
+from .latex import escape_latex
+from .profiles import PROFILES, Profile, get_profile
+from .tables import TableRule, TableStyle
+
+__all__ = [
+    'PROFILES', 'Parser', 'Profile', 'TableRule', 'TableStyle',
+    'convert', 'convert_file', 'escape_latex', 'get_profile', 'iter_convert',
+    'parse', 'render',
+]
@@ -0,0 +1,31 @@
+import argparse
+import sys
+
+from . import PROFILES, convert_file
+from .backends import BACKENDS
+from .engine import iter_convert, read_lines, write_lines
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='python -m mdtex',
+        description='Convert an informe_final Markdown file to LaTeX.')
+    parser.add_argument('profile', choices=sorted(PROFILES))
+    parser.add_argument('input', help="Markdown file, or '-' for stdin")
+    parser.add_argument('output', help="output file, or '-' for stdout")
+    parser.add_argument('--format', choices=sorted(BACKENDS), default='latex',
+                        help='output format (default: %(default)s)')
+    args = parser.parse_args()
+    if '-' in (args.input, args.output):
+        # Streams line by line, e.g. for a concatenated full report
+        src = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8')
+        dst = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+        with src, dst:
+            write_lines(iter_convert(read_lines(src), args.profile, backend=args.format), dst)
+        return
+    convert_file(args.input, args.output, args.profile, backend=args.format)
+    print(f"Successfully converted {args.input} to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Text analysis shared by the retrieval indexes and their queries.
+
+    python -m mdtex.analyzer                      # benchmark over docs/
+    python -m mdtex.analyzer --show 'Gestión de los Interesados'
+
+An Analyzer turns text into index terms: NFC normalization, lowercasing,
+word tokens, accent folding (á -> a, ñ -> n), Spanish and English
+stopwords dropped, and Spanish light stemming (stem_light()). The same
+analyzer must run at index and at query time, so indexes record its name
+(see ANALYZERS).
+
+Words repeat a lot, so each distinct token is analyzed once and kept in a
+bounded LRU cache of token -> term.
+"""
+
+import argparse
+import re
+import sys
+import time
+import unicodedata
+from functools import lru_cache
+
+CACHE_SIZE = 65536
+
+WORD_RE = re.compile(r'[^\W_]+')
+
+# Folded forms: no accents, lowercase
+SPANISH_STOPWORDS = frozenset("""
+a al algo algun alguna algunas alguno algunos ante antes asi aun aunque cada como con
+contra cual cuales cuando cuanto de del desde donde dos durante e el ella ellas ello
+ellos en entre era eran es esa esas ese eso esos esta estaba estado estan estar estas
+este esto estos fue fueron ha habia han hasta hay la las le les lo los mas me mi mis
+mucho muy nada ni no nos nosotros o otra otras otro otros para pero poco por porque
+puede pueden que quien quienes se sea segun ser si sido siempre sin sino sobre son su
+sus tambien tan tanto te tiene tienen todo todos tras tu tus un una unas uno unos y ya
+yo
+""".split())
+
+ENGLISH_STOPWORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before
+being between both but by can could did do does doing down during each few for from
+further had has have having he her here hers him his how i if in into is it its itself
+just me more most my no nor not of off on once only or other our ours out over own
+same she should so some such than that the their theirs them then there these they
+this those through to too under until up very was we were what when where which while
+who whom why will with would you your yours
+""".split())
+
+STOPWORDS = SPANISH_STOPWORDS | ENGLISH_STOPWORDS
+
+
+def fold(word):
+    """word without accents or diacritics: 'gestión' -> 'gestion', 'año' -> 'ano'."""
+    if word.isascii():
+        return word
+    return ''.join(c for c in unicodedata.normalize('NFD', word)
+                   if not unicodedata.combining(c))
+
+
+def stem_light(word):
+    """Spanish light stemming of a folded word (Savoy's rules).
+
+    Drops the final vowel of gender and number and the plural -s/-es:
+    'proyectos', 'proyecto' -> 'proyect'; 'gestiones' -> 'gestion';
+    'lapices' -> 'lapiz'. Words under five letters are left as they are.
+    """
+    if len(word) < 5:
+        return word
+    last = word[-1]
+    if last in 'aeo':
+        return word[:-1]
+    if last == 's':
+        if word.endswith('eses'):
+            return word[:-2]
+        if word.endswith('ces'):
+            return word[:-3] + 'z'
+        if word[-2] in 'aeo':
+            return word[:-2]
+    return word
+
+
+class Analyzer:
+    """Text to index terms, with a bounded cache of analyzed tokens."""
+
+    def __init__(self, name, stopwords=STOPWORDS, stem=stem_light, cache_size=CACHE_SIZE):
+        self.name = name
+        self.stopwords = stopwords
+        self.stem = stem
+        self.term = lru_cache(maxsize=cache_size)(self._term)
+
+    def _term(self, token):
+        """The index term of a lowercased token, or None for a stopword."""
+        word = fold(token)
+        if word in self.stopwords:
+            return None
+        return self.stem(word) if self.stem else word
+
+    def __call__(self, text):
+        """The index terms of text, in order."""
+        if not text.isascii():
+            text = unicodedata.normalize('NFC', text)
+        term = self.term
+        return [t for t in map(term, WORD_RE.findall(text.lower())) if t]
+
+
+ANALYZER = Analyzer('es-light')
+
+# Analyzers by the name indexes record
+ANALYZERS = {analyzer.name: analyzer for analyzer in (ANALYZER,)}
+
+
+def get_analyzer(name):
+    try:
+        return ANALYZERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown analyzer: {name!r}") from None
+
+
+def main(argv=None):
+    from .chunks import DEFAULT_PATHS, markdown_files
+
+    parser = argparse.ArgumentParser(prog='python -m mdtex.analyzer',
+                                     description='Benchmark the text analyzer.')
+    parser.add_argument('paths', nargs='*', default=list(DEFAULT_PATHS))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--show', metavar='TEXT', help='print the terms of TEXT and exit')
+    args = parser.parse_args(argv)
+    if args.show is not None:
+        print(' '.join(ANALYZER(args.show)))
+        return 0
+
+    texts = []
+    for path in markdown_files(args.paths):
+        with open(path, 'r', encoding='utf-8') as f:
+            texts.append(f.read())
+    tokens = sum(len(WORD_RE.findall(text)) for text in texts)
+
+    def run(analyzer):
+        start = time.perf_counter()
+        terms = sum(len(analyzer(text)) for text in texts)
+        return terms, time.perf_counter() - start
+
+    uncached = Analyzer('bench', cache_size=0)
+    cold = Analyzer('bench')
+    terms, seconds = run(uncached)
+    print(f"{len(texts)} files, {tokens} tokens -> {terms} terms")
+    print(f"  uncached  {tokens / seconds:12,.0f} tokens/s")
+    _, seconds = run(cold)
+    print(f"  cold LRU  {tokens / seconds:12,.0f} tokens/s")
+    seconds = min(run(cold)[1] for _ in range(args.repeat))
+    info = cold.term.cache_info()
+    print(f"  warm LRU  {tokens / seconds:12,.0f} tokens/s "
+          f"({info.currsize} distinct tokens cached, {info.hits / (info.hits + info.misses):.1%} hits)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""Master LaTeX document for the whole report.
+
+    python -m mdtex.assemble                      # docs/informe_final/INFORME.tex
+    python -m mdtex.assemble --only cap4 ANEXO-B  # \\includeonly those units
+    python -m mdtex.assemble --output tesis.tex --title 'Informe Final'
+
+Every manifest job's output is one \\include unit, the chapters and then
+the annexes in the order ESTRUCTURA_INFORME.md lists them, so that
+\\includeonly typesets a single chapter with the page numbers and
+references of the last full run. The preamble loads the packages the
+units' LaTeX uses, found by scanning the generated files; run mdtex.build
+first. minted needs pdflatex -shell-escape.
+"""
+
+import argparse
+import os
+import re
+import sys
+
+from .build import DEFAULT_MANIFEST, load_manifest, select_jobs
+from .latex import escape_latex
+
+STRUCTURE_FILE = 'ESTRUCTURA_INFORME.md'
+MASTER_FILE = 'INFORME.tex'
+
+# (package, options, pattern of the units' LaTeX that needs it, or None
+# for always); hyperref goes last
+PACKAGES = (
+    ('inputenc', 'utf8', None),
+    ('fontenc', 'T1', None),
+    ('babel', 'spanish', None),
+    ('geometry', 'a4paper,margin=3cm', None),  # the 15 cm text width of ColumnPlanner
+    ('amssymb', '', r'\\checkmark'),
+    ('fontawesome5', '', r'\\fa[A-Z]'),  # the icons of profiles.EMOJI_SYMBOLS
+    ('graphicx', '', r'\\includegraphics'),
+    ('float', '', r'\\begin\{(?:table|figure)\}\[H\]'),
+    ('tabularx', '', r'\\begin\{tabularx\}'),
+    ('longtable', '', r'\\begin\{longtable\}'),
+    ('xltabular', '', r'\\begin\{xltabular\}'),
+    ('minted', '', r'\\begin\{minted\}'),
+    ('hyperref', '', None),
+)
+
+# A chapter or annex heading, or list item, of the structure document:
+# '## 2. Capítulo 1: Introducción', '*   **Anexo A**: Manual de Usuario.'
+OUTLINE_RE = re.compile(r'\s*(?:#+|[*-])\s+(?:\d+\.\s+)?\**(cap[ií]tulo|anexo)\s+(\d+|[a-z])\b',
+                        re.IGNORECASE)
+# A unit's file name: CAPITULO-4, ANEXO-B
+UNIT_FILE_RE = re.compile(r'(cap[ií]tulo|anexo)[-_ ]?(\d+|[a-z])$', re.IGNORECASE)
+
+
+def _unit_key(kind, number):
+    return ('anexo' if kind.lower() == 'anexo' else 'capitulo', number.upper())
+
+
+def _unit_name(job):
+    return os.path.splitext(os.path.basename(job.output))[0]
+
+
+def outline(text):
+    """(kind, number) of the chapters and annexes, in the order text lists them."""
+    keys = []
+    for line in text.splitlines():
+        match = OUTLINE_RE.match(line)
+        if match and _unit_key(*match.groups()) not in keys:
+            keys.append(_unit_key(*match.groups()))
+    return keys
+
+
+def order_units(jobs, keys):
+    """The jobs in outline order.
+
+    Units the outline leaves out (such as a chapter added later) follow
+    the listed ones of their kind by number; files that are neither
+    chapter nor annex go last, in manifest order.
+    """
+    kinds = list(dict.fromkeys(kind for kind, _ in keys))
+
+    def sort_key(item):
+        index, job = item
+        match = UNIT_FILE_RE.match(_unit_name(job))
+        if not match:
+            return (len(kinds) + 1, 0, 0, index)
+        kind, number = key = _unit_key(*match.groups())
+        rank = kinds.index(kind) if kind in kinds else len(kinds)
+        if key in keys:
+            return (rank, 0, keys.index(key), index)
+        return (rank, 1, int(number) if number.isdigit() else ord(number), index)
+
+    return [job for _, job in sorted(enumerate(jobs), key=sort_key)]
+
+
+def needed_packages(paths):
+    """The PACKAGES entries the LaTeX files use, in PACKAGES order."""
+    patterns = [(entry, re.compile(pattern)) for entry in PACKAGES
+                for pattern in [entry[2]] if pattern]
+    used = set()
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            text = ''.join(line for line in f if not line.lstrip().startswith('%'))
+        used.update(entry for entry, pattern in patterns if pattern.search(text))
+    return [entry for entry in PACKAGES if entry[2] is None or entry in used]
+
+
+def _include(job, base):
+    # \include takes the path without the .tex extension, with / separators
+    return os.path.splitext(os.path.relpath(job.output, base))[0].replace(os.sep, '/')
+
+
+def master(units, base, title, only=()):
+    """Lines of the master document \\including units, relative to base."""
+    lines = [r'\documentclass[12pt]{report}']
+    for package, options, _ in needed_packages([job.output for job in units]):
+        lines.append(r'\usepackage' + (f'[{options}]' if options else '') + '{' + package + '}')
+    if only:
+        lines.append(r'\includeonly{' + ','.join(_include(job, base) for job in only) + '}')
+    lines += ['', r'\title{' + escape_latex(title) + '}', r'\date{}', '',
+              r'\begin{document}', r'\maketitle', r'\tableofcontents', r'\listoffigures',
+              r'\listoftables', '']
+    appendix = False
+    for job in units:
+        match = UNIT_FILE_RE.match(_unit_name(job))
+        if match and not appendix and _unit_key(*match.groups())[0] == 'anexo':
+            lines.append(r'\appendix')
+            appendix = True
+        lines.append(r'\include{' + _include(job, base) + '}')
+    lines += ['', r'\end{document}']
+    return lines
+
+
+def _title(text):
+    # '# Estructura del Informe Final: Asistente de Preparación PMP'
+    for line in text.splitlines():
+        if line.startswith('# '):
+            return line[2:].split(':', 1)[-1].strip()
+    return 'Informe Final'
+
+
+def write_if_changed(path, lines):
+    """Writes lines unless path already holds them; returns whether it did."""
+    text = '\n'.join(lines) + '\n'
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            if f.read() == text:
+                return False
+    except OSError:
+        pass
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m mdtex.assemble',
+                                     description='Write the master document of the report.')
+    parser.add_argument('--manifest', default=DEFAULT_MANIFEST)
+    parser.add_argument('--structure', default=None,
+                        help=f'chapter order (default: {STRUCTURE_FILE} next to the manifest)')
+    parser.add_argument('--output', default=None,
+                        help=f'master file (default: {MASTER_FILE} next to the manifest)')
+    parser.add_argument('--title', default=None,
+                        help="report title (default: from the structure's heading)")
+    parser.add_argument('--only', nargs='+', default=(), metavar='NAME',
+                        help='profiles or file names for \\includeonly')
+    args = parser.parse_args(argv)
+
+    base = os.path.dirname(os.path.abspath(args.manifest))
+    output = os.path.abspath(args.output or os.path.join(base, MASTER_FILE))
+    try:
+        jobs = load_manifest(args.manifest)
+        only = select_jobs(jobs, args.only) if args.only else ()
+        with open(args.structure or os.path.join(base, STRUCTURE_FILE), 'r',
+                  encoding='utf-8') as f:
+            structure = f.read()
+    except (OSError, ValueError, KeyError) as e:
+        parser.error(str(e))
+    missing = [job.output for job in jobs if not os.path.exists(job.output)]
+    if missing:
+        parser.error(f"not built yet (run mdtex.build): {', '.join(map(os.path.basename, missing))}")
+
+    keys = outline(structure)
+    units = order_units(jobs, keys)
+    for job in units:
+        match = UNIT_FILE_RE.match(_unit_name(job))
+        if not match or _unit_key(*match.groups()) not in keys:
+            print(f"warning: {_unit_name(job)} is not in the structure; placed by number",
+                  file=sys.stderr)
+    lines = master(units, os.path.dirname(output), args.title or _title(structure), only)
+    written = write_if_changed(output, lines)
+    print(f"{output}: {len(units)} units, {'written' if written else 'unchanged'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""Audit of the non-ASCII characters in the Markdown corpus.
+
+    python -m mdtex.audit                          # docs/
+    python -m mdtex.audit docs/informe_final --profile anexo_d
+
+Lists, with counts and locations, every character that no symbol map
+replaces and that LaTeX's utf8 input encoding does not typeset. Emoji
+among them would fail the conversion (see mdtex.symbols), so the audit
+exits 1 when it finds any. Documents of a manifest are checked against
+their own profile's map, other files against every profile's.
+"""
+
+import argparse
+import os
+import sys
+import unicodedata
+from collections import defaultdict
+
+from .build import REPO_ROOT
+from .chunks import manifest_profiles
+from .profiles import PROFILES, get_profile
+from .symbols import EMOJI_RE, VARIATION_SELECTOR, make_transliterator
+
+# Non-ASCII characters the utf8 input encoding typesets besides Latin
+# letters and Latin-1 punctuation
+TEXT_SAFE = frozenset('\u2013\u2014\u2018\u2019\u201c\u201d\u2026\u2022\u20ac')
+
+
+def _text_safe(char):
+    return ord(char) < 0x250 or char in TEXT_SAFE
+
+
+def audit(paths, symbols=(), checkboxes=True):
+    """Unmapped characters of the Markdown files under paths.
+
+    Returns {character: [(path, line, column), ...]}, the locations in
+    file order.
+    """
+    transliterate = make_transliterator(symbols, checkboxes)
+    mapped = transliterate.symbols if transliterate else frozenset()
+    found = defaultdict(list)
+    for path in _markdown_files(paths):
+        with open(path, 'r', encoding='utf-8') as f:
+            for number, line in enumerate(f, 1):
+                if line.isascii():
+                    continue
+                previous = ''
+                for column, char in enumerate(line, 1):
+                    if not (_text_safe(char) or char in mapped or char == VARIATION_SELECTOR
+                            and previous in mapped):
+                        found[char].append((path, number, column))
+                    previous = char
+    return found
+
+
+def _markdown_files(paths):
+    for path in paths:
+        if os.path.isfile(path):
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith('.md'):
+                    yield os.path.join(root, name)
+
+
+def _all_symbols():
+    return tuple(pair for profile in PROFILES.values() for pair in profile.symbols)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m mdtex.audit',
+                                     description='List non-ASCII characters no symbol map covers.')
+    parser.add_argument('paths', nargs='*', default=[os.path.join(REPO_ROOT, 'docs')])
+    parser.add_argument('--profile', default=None,
+                        help="audit every file against this profile's map (default: each "
+                             "manifest document against its profile's)")
+    parser.add_argument('--locations', type=int, default=5,
+                        help='locations listed per character (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    profiles = {} if args.profile else manifest_profiles(args.paths)
+    found = defaultdict(list)
+    for path in _markdown_files(args.paths):
+        name = args.profile or profiles.get(os.path.abspath(path))
+        if name:
+            profile = get_profile(name)
+            places = audit([path], profile.symbols, profile.checkboxes)
+        else:
+            places = audit([path], _all_symbols())
+        for char, locations in places.items():
+            found[char].extend(locations)
+    emoji = 0
+    for char, places in sorted(found.items(), key=lambda item: (-len(item[1]), item[0])):
+        fatal = bool(EMOJI_RE.match(char))
+        emoji += fatal
+        shown = ', '.join(f"{os.path.relpath(path)}:{line}:{column}"
+                          for path, line, column in places[:args.locations])
+        more = f", ... {len(places) - args.locations} more" if len(places) > args.locations else ""
+        print(f"{'EMOJI' if fatal else 'text '} U+{ord(char):04X} {unicodedata.name(char, '?')} "
+              f"x{len(places)}: {shown}{more}")
+    print(f"{len(found)} unmapped characters, {emoji} of them emoji")
+    return 1 if emoji else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+"""Renderers from the intermediate representation (mdtex.ir) to output lines.
+
+Every backend maps one top-level node to a list of output lines, so a
+parsed document can be rendered to several formats, and streamed, without
+parsing it again.
+"""
+
+import json
+import re
+
+from . import ir
+from .latex import escape_latex
+from .tables import (
+    render_long_table_end, render_long_table_head, render_long_table_rows, render_table,
+    split_row,
+)
+
+# Profile fields (see profiles.RENDER_FIELDS) the output of each node type
+# depends on; types not listed depend on none. engine.block_key keys a
+# block by the fields of the nodes it holds, so that after a render-only
+# profile edit the cached output of the blocks it does not touch is reused.
+INLINE_FIELDS = ('escape', 'code_spans', 'checkboxes', 'symbols', 'strict_symbols')
+TABLE_FIELDS = INLINE_FIELDS + ('table',)
+RENDER_DEPENDENCIES = {
+    ir.Heading: INLINE_FIELDS + ('heading_commands', 'heading_text'),
+    ir.Paragraph: INLINE_FIELDS + ('paragraph_gap',),
+    ir.Line: INLINE_FIELDS,
+    ir.Remark: INLINE_FIELDS,
+    ir.Item: INLINE_FIELDS,
+    ir.Table: TABLE_FIELDS,
+    ir.TableHead: TABLE_FIELDS,
+    ir.TableRows: TABLE_FIELDS,
+    ir.TableEnd: ('table',),
+}
+
+
+def render_fields(nodes):
+    """The profile fields that the output of nodes depends on, as a frozenset."""
+    fields = set()
+    for node in nodes:
+        cls = type(node)
+        if cls is ir.List or cls is ir.Quote:
+            fields |= render_fields(node.children)
+        else:
+            fields.update(RENDER_DEPENDENCIES.get(cls, ()))
+    return frozenset(fields)
+
+
+class LatexBackend:
+    """Renders nodes the way the profile's original converter did."""
+
+    def __init__(self, rules, profile):
+        self.profile = profile
+        self.fmt = rules.fmt
+        self.fmt_batch = rules.fmt_batch
+        self.heading_fmt = rules.heading_fmt
+        self._render = {
+            ir.Blank: lambda node, out: out.append(""),
+            ir.Heading: self._heading,
+            ir.Paragraph: self._paragraph,
+            ir.Line: lambda node, out: out.append(self.fmt(node.text)),
+            ir.Remark: lambda node, out: out.append(r"\textit{" + self.fmt(node.text) + "}"),
+            ir.Item: lambda node, out: out.append(r"\item " + self.fmt(node.text)),
+            ir.List: self._list,
+            ir.Quote: self._quote,
+            ir.Code: self._code,
+            ir.Caption: self._caption,
+            ir.Table: self._table,
+            ir.TableHead: self._table_head,
+            ir.TableRows: self._table_rows,
+            ir.TableEnd: self._table_end,
+        }
+
+    def render(self, node, out=None):
+        out = [] if out is None else out
+        self._render[type(node)](node, out)
+        return out
+
+    def _heading(self, node, out):
+        commands = self.profile.heading_commands
+        command = commands[min(node.level, len(commands)) - 1]
+        out.append("\\" + command + "{" + self.heading_fmt(node.text) + "}")
+
+    def _paragraph(self, node, out):
+        out.append(self.fmt(node.text))
+        if self.profile.paragraph_gap:
+            # Blank line for paragraph separation in LaTeX
+            out.append("")
+
+    def _children(self, children, out):
+        for child in children:
+            self._render[type(child)](child, out)
+
+    def _list(self, node, out):
+        out.append(r"\begin{" + node.kind + "}")
+        self._children(node.children, out)
+        out.append(r"\end{" + node.kind + "}")
+
+    def _quote(self, node, out):
+        out.append(r"\begin{quote}")
+        self._children(node.children, out)
+        out.append(r"\end{quote}")
+
+    def _code(self, node, out):
+        out.append(r"\begin{minted}{" + node.lang + "}")
+        out.extend(node.lines)
+        out.append(r"\end{minted}")
+
+    def _caption(self, node, out):
+        out.append(r"\begin{" + node.kind + "}[H]")
+        out.append(r"\centering")
+        if node.placeholder:
+            out.append(r"% \includegraphics[width=0.8\textwidth]{placeholder.png}")
+        out.append(r"\caption{" + escape_latex(node.text) + "}")
+        out.append(r"\label{" + escape_latex(node.label) + "}")
+        out.append(r"\end{" + node.kind + "}")
+
+    def _table(self, node, out):
+        out.append(render_table(node.rows, self.profile.table, self.fmt_batch, node.caption))
+
+    def _table_head(self, node, out):
+        out.append(render_long_table_head(node.rows, self.profile.table, self.fmt_batch,
+                                          node.caption))
+
+    def _table_rows(self, node, out):
+        out.append(render_long_table_rows(node.header, node.rows, self.profile.table,
+                                          self.fmt_batch))
+
+    def _table_end(self, node, out):
+        out.append(render_long_table_end(self.profile.table))
+
+
+# Code spans lose their backticks; '*' runs that touch a word are emphasis.
+_MARKUP_RE = re.compile(r'`([^`\n]*)`|\*+(?=\S)|(?<=\S)\*+')
+
+
+def plain_inline(text):
+    """Drops inline Markdown markup, keeping the text."""
+    return _MARKUP_RE.sub(lambda m: m.group(1) or '', text)
+
+
+class TextBackend:
+    """Plain text for search indexes and previews: no markup, one line per block line."""
+
+    def __init__(self, rules=None, profile=None):
+        self._render = {
+            ir.Blank: lambda node, out: out.append(""),
+            ir.Heading: lambda node, out: out.append(plain_inline(node.text.strip())),
+            ir.Paragraph: lambda node, out: out.append(plain_inline(node.text.strip())),
+            ir.Line: lambda node, out: out.append("    " + plain_inline(node.text)),
+            ir.Remark: lambda node, out: out.append(plain_inline(node.text)),
+            ir.List: self._list,
+            ir.Quote: self._children,
+            ir.Code: lambda node, out: out.extend(node.lines),
+            ir.Caption: lambda node, out: out.append(node.text),
+            ir.Table: self._table,
+            ir.TableHead: self._table_head,
+            ir.TableRows: lambda node, out: out.extend(self._row(row) for row in node.rows),
+            ir.TableEnd: lambda node, out: None,
+        }
+
+    def render(self, node, out=None):
+        out = [] if out is None else out
+        self._render[type(node)](node, out)
+        return out
+
+    def _children(self, node, out):
+        for child in node.children:
+            self._render[type(child)](child, out)
+
+    def _list(self, node, out):
+        number = 0
+        for child in node.children:
+            if type(child) is ir.Item:
+                number += 1
+                marker = f"{number}. " if node.kind == 'enumerate' else "- "
+                out.append(marker + plain_inline(child.text))
+            elif type(child) is ir.List:
+                # Nested lists are indented under their item
+                out.extend("  " + line for line in self._list(child, []))
+            else:
+                self._render[type(child)](child, out)
+        return out
+
+    def _row(self, row):
+        return " | ".join(plain_inline(cell) for cell in split_row(row))
+
+    def _table(self, node, out):
+        if node.caption:
+            out.append(node.caption.text)
+        for i, row in enumerate(node.rows):
+            if i != 1 or len(node.rows) < 3:
+                out.append(self._row(row))
+
+    def _table_head(self, node, out):
+        self._table(node, out)
+
+
+class JsonBackend:
+    """One JSON object per top-level node (JSON Lines), see ir.Node.to_dict()."""
+
+    def __init__(self, rules=None, profile=None):
+        pass
+
+    def render(self, node, out=None):
+        out = [] if out is None else out
+        out.append(json.dumps(node.to_dict(), ensure_ascii=False))
+        return out
+
+
+BACKENDS = {
+    'latex': LatexBackend,
+    'text': TextBackend,
+    'json': JsonBackend,
+}
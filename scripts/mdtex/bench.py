@@ -0,0 +1,334 @@
+"""Benchmarks for the converter.
+
+    python -m mdtex.bench corpus                  # every corpus at 1x..1000x
+    python -m mdtex.bench corpus --scales 1 10 --save
+    python -m mdtex.bench corpus --compare        # fail on a regression vs. the last saved run
+    python -m mdtex.bench parse-cache             # cold build vs. re-render after a profile edit
+
+The corpus benchmark repeats a real informe_final document 1, 10, 100 and
+1000 times and times each stage on it: parse (Markdown to IR), render (IR
+to LaTeX) and convert (file to file, streaming). Every measurement runs in
+a fresh process so that its peak RSS is its own.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from .build import DEFAULT_MANIFEST, REPO_ROOT, load_manifest
+from .cache import BlockCache
+from .engine import convert_file, read_lines, render, render_blocks, parse
+from .parsecache import ParseCache
+from .profiles import get_profile
+
+
+def best_of(repeat, fn):
+    """Fastest of repeat runs of fn(), in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+# Corpus name -> (informe_final source, profile)
+CORPORA = {
+    'tables': ('ANEXO-C.md', 'anexo_c'),
+    'lists': ('CAPITULO-4.md', 'cap4'),
+    'prose': ('CAPITULO-2.md', 'cap2'),
+}
+SCALES = (1, 10, 100, 1000)
+STAGES = ('parse', 'render', 'convert')
+
+SOURCE_DIR = os.path.join(REPO_ROOT, 'docs', 'informe_final')
+HISTORY_FILE = os.path.join(REPO_ROOT, '.mdtex-bench', 'history.json')
+DEFAULT_TOLERANCE = 0.15
+
+# Each measurement repeats until it has run this long, keeping the best time
+TIME_BUDGET = 0.5
+
+
+def make_corpus(name, scale, directory):
+    """Writes the corpus repeated scale times; returns its path."""
+    source, _ = CORPORA[name]
+    path = os.path.join(directory, f'{name}-{scale}x.md')
+    with open(os.path.join(SOURCE_DIR, source), 'r', encoding='utf-8') as f:
+        text = f.read().rstrip('\n') + '\n\n'
+    if not (os.path.exists(path) and os.path.getsize(path) == len(text.encode('utf-8')) * scale):
+        with open(path, 'w', encoding='utf-8') as f:
+            for _ in range(scale):
+                f.write(text)
+    return path
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+def _timed(fn):
+    runs, best, spent = 0, float('inf'), 0.0
+    while runs < 3 and spent < TIME_BUDGET or runs == 0:
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        spent += elapsed
+        runs += 1
+    return best, runs
+
+
+def _drain(iterable):
+    for _ in iterable:
+        pass
+
+
+def measure(stage, path, profile):
+    """Times one stage on one corpus file; run in a process of its own."""
+    profile = get_profile(profile)
+
+    def read():
+        with open(path, 'r', encoding='utf-8') as f:
+            return list(read_lines(f))
+
+    if stage == 'parse':
+        lines = read()
+        seconds, runs = _timed(lambda: _drain(parse(lines, profile)))
+    elif stage == 'render':
+        nodes = list(parse(read(), profile))
+        seconds, runs = _timed(lambda: _drain(render(nodes, profile)))
+    elif stage == 'convert':
+        output = path + '.tex'
+        if os.path.exists(output):
+            os.remove(output)
+        seconds, runs = _timed(lambda: convert_file(path, output, profile))
+    else:
+        raise ValueError(f"Unknown stage: {stage}")
+
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        lines = sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(1 << 20), b''))
+    return {
+        'stage': stage,
+        'profile': profile.name,
+        'bytes': size,
+        'lines': lines,
+        'seconds': seconds,
+        'runs': runs,
+        'mb_per_s': size / 2**20 / seconds,
+        'lines_per_s': lines / seconds,
+        'peak_rss_mb': _peak_rss_mb(),
+    }
+
+
+def bench_corpora(corpora=tuple(CORPORA), scales=SCALES, stages=STAGES,
+                  directory=None, out=sys.stdout):
+    """Runs every (corpus, scale, stage) measurement; returns the results."""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = directory or tmp
+        os.makedirs(directory, exist_ok=True)
+        ctx = multiprocessing.get_context()
+        with ctx.Pool(1, maxtasksperchild=1) as pool:
+            for name in corpora:
+                profile = CORPORA[name][1]
+                for scale in scales:
+                    path = make_corpus(name, scale, directory)
+                    for stage in stages:
+                        result = pool.apply(measure, (stage, path, profile))
+                        result.update(corpus=name, scale=scale)
+                        results.append(result)
+                        print(_format_result(result), file=out, flush=True)
+    return results
+
+
+def _format_result(r):
+    rss = f"{r['peak_rss_mb']:7.1f} MB" if r['peak_rss_mb'] is not None else '      n/a'
+    return (f"  {r['corpus']:<7} {r['scale']:>5}x {r['stage']:<8} {r['profile']:<8} "
+            f"{r['mb_per_s']:8.2f} MB/s {r['lines_per_s']:11,.0f} lines/s  {rss}")
+
+
+def result_key(result):
+    return (result['corpus'], result['scale'], result['stage'], result['profile'])
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Returns (result, baseline result, change) for every measurement whose
+    throughput fell by more than tolerance (a fraction) against baseline."""
+    previous = {result_key(r): r for r in baseline['results']}
+    regressions = []
+    for r in results:
+        old = previous.get(result_key(r))
+        if old is None:
+            continue
+        change = r['mb_per_s'] / old['mb_per_s'] - 1
+        if change < -tolerance:
+            regressions.append((r, old, change))
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def make_run(results):
+    return {
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': results,
+    }
+
+
+def load_history(path):
+    """Saved runs, oldest first; an empty list when there are none."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+def save_history(path, history):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(history, f, indent=1)
+        f.write('\n')
+    os.replace(tmp, path)
+
+
+def _cold(job, profile):
+    with open(job.input, 'r', encoding='utf-8') as f:
+        return list(render(parse(read_lines(f), profile), profile))
+
+
+def _from_cache(job, profile, parsed, blocks=None):
+    return list(render_blocks(parsed.blocks(job.input, profile), profile, blocks))
+
+
+def _after_edit(job, profile, edited, parsed):
+    # A build with profile fills the block cache, then only the render
+    # after the edit is timed
+    blocks = BlockCache()
+    _from_cache(job, profile, parsed, blocks)
+    start = time.perf_counter()
+    _from_cache(job, edited, parsed, blocks)
+    return time.perf_counter() - start
+
+
+def bench_parse_cache(jobs, repeat=20, out=sys.stdout):
+    """Times a cold conversion against re-rendering after a render-only edit.
+
+    The edit swaps the table environment. The parse digest stays the same,
+    so the parse cache still applies, and only the blocks holding tables
+    key differently in the block cache (see engine.block_key): the others
+    come from the build before the edit. The output must match a cold
+    conversion with the same edit.
+    """
+    totals = [0.0, 0.0]
+    with tempfile.TemporaryDirectory() as directory:
+        parsed = ParseCache(directory)
+        for job in jobs:
+            profile = edited = get_profile(job.profile)
+            _from_cache(job, profile, parsed)  # warm the parse cache
+            if profile.table is not None:
+                edited = replace(profile, table=replace(
+                    profile.table, environment='tabularx' if profile.table.environment ==
+                    'tabular' else 'tabular'))
+            blocks = BlockCache()
+            _from_cache(job, profile, parsed, blocks)
+            if _from_cache(job, edited, parsed, blocks) != _cold(job, edited):
+                raise AssertionError(f"cached render differs for {job.input}")
+
+            cold = best_of(repeat, lambda: _cold(job, edited))
+            warm = min(_after_edit(job, profile, edited, parsed) for _ in range(repeat))
+            totals[0] += cold
+            totals[1] += warm
+            print(f"  {os.path.basename(job.input):<16} cold {cold * 1000:7.2f} ms  "
+                  f"cached {warm * 1000:7.2f} ms  {cold / warm:5.1f}x", file=out)
+        print(f"{len(jobs)} documents: cold {totals[0] * 1000:.1f} ms, "
+              f"after the edit {totals[1] * 1000:.1f} ms ({totals[0] / totals[1]:.1f}x); "
+              f"{parsed.hits} parse cache hits, {parsed.misses} misses", file=out)
+    return totals
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m mdtex.bench',
+                                     description='Converter benchmarks.')
+    commands = parser.add_subparsers(dest='benchmark', required=True)
+
+    corpus = commands.add_parser('corpus', help='throughput on synthetic corpora')
+    corpus.add_argument('--corpora', nargs='+', choices=sorted(CORPORA), default=list(CORPORA))
+    corpus.add_argument('--scales', nargs='+', type=int, default=list(SCALES))
+    corpus.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES))
+    corpus.add_argument('--corpus-dir', default=None,
+                        help='keep the generated corpora here (default: a temporary directory)')
+    corpus.add_argument('--history', default=HISTORY_FILE,
+                        help='JSON file of saved runs (default: %(default)s)')
+    corpus.add_argument('--save', action='store_true', help='append this run to the history')
+    corpus.add_argument('--compare', action='store_true',
+                        help='compare with the baseline and exit 1 on a regression')
+    corpus.add_argument('--baseline', default=None,
+                        help='JSON file with the baseline run (default: last run in the history)')
+    corpus.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='allowed throughput loss as a fraction (default: %(default)s)')
+
+    cache = commands.add_parser('parse-cache', help='cold build vs. cached parse')
+    cache.add_argument('--manifest', default=DEFAULT_MANIFEST)
+    cache.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    if args.benchmark == 'parse-cache':
+        bench_parse_cache(load_manifest(args.manifest), args.repeat)
+        return 0
+
+    if args.compare:
+        if args.baseline:
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        else:
+            history = load_history(args.history)
+            if not history:
+                parser.error(f"no saved runs in {args.history}; run with --save first")
+            baseline = history[-1]
+
+    results = bench_corpora(args.corpora, args.scales, args.stages, args.corpus_dir)
+    if args.save:
+        history = load_history(args.history)
+        history.append(make_run(results))
+        save_history(args.history, history)
+
+    if not args.compare:
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    for r, old, change in regressions:
+        print(f"REGRESSION {r['corpus']} {r['scale']}x {r['stage']} {r['profile']}: "
+              f"{old['mb_per_s']:.2f} -> {r['mb_per_s']:.2f} MB/s ({change:+.0%})")
+    print(f"{len(regressions)} regressions against the run of {baseline.get('date')} "
+          f"({baseline.get('commit')}), tolerance {args.tolerance:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
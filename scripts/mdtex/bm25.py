@@ -0,0 +1,317 @@
+"""BM25 index of the retrieval chunks in one memory-mappable file.
+
+    python -m mdtex.bm25 build                     # docs/retrieval/chunks.jsonl -> bm25.idx
+    python -m mdtex.bm25 query 'gestión de riesgos' -k 5
+
+The index is read in place through mmap: opening it parses a header, and
+a query binary-searches the sorted term table and decodes the postings
+of its terms only. Nothing is deserialized up front, so a cold start costs
+the page faults of the terms a query touches. The length norms for the
+file's own average length are stored too; mdtex.segments scores several
+index files with their collection's average instead, computed from the
+stored document lengths.
+
+File layout (little-endian, sections 8-byte aligned):
+
+    header     HEADER: magic, analyzer name (see mdtex.analyzer), document
+               and term counts, k1, b, average document length and the
+               offsets of the sections below
+    terms      per term, sorted by UTF-8 bytes: uint32 offset and length
+               of the term in the term text, uint32 offset of its postings
+               and uint32 document frequency
+    term text  the terms' UTF-8 bytes, concatenated
+    postings   per term, (document number delta, term frequency) pairs as
+               LEB128 varints, in document order
+    lengths    per document, uint32 term count
+    norms      per document, float64 k1 * (1 - b + b * length / average)
+    ids        uint32 offsets (documents + 1) into the id text, then the
+               chunk ids' UTF-8 bytes
+"""
+
+import argparse
+import heapq
+import math
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+
+from .analyzer import ANALYZER, get_analyzer
+from .build import REPO_ROOT
+from .chunks import read_chunks
+
+DEFAULT_CHUNKS = os.path.join(REPO_ROOT, 'docs', 'retrieval', 'chunks.jsonl')
+DEFAULT_INDEX = os.path.join(REPO_ROOT, 'docs', 'retrieval', 'bm25.idx')
+
+MAGIC = b'MDBM25\x00\x04'
+HEADER = struct.Struct('<8s16sIIdddIIIIIII4x')
+TERM = struct.Struct('<IIII')
+K1 = 1.2
+B = 0.75
+
+
+def chunk_text(chunk):
+    """The text of a chunk that is indexed: its heading path and its lines."""
+    return '\n'.join(chunk.path) + '\n' + chunk.text
+
+
+def _varint(value, out):
+    while value >= 0x80:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _align(out):
+    out.extend(bytes(-len(out) % 8))
+
+
+def _norms(lengths, k1, b, average):
+    return (k1 * (1 - b + b * n / average) if average else k1 for n in lengths)
+
+
+def write_index(documents, path, k1=K1, b=B, analyzer=ANALYZER):
+    """Writes the BM25 index of (id, terms) pairs; returns the document count.
+
+    analyzer is the one that made the terms, recorded for the queries.
+    """
+    ids = []
+    lengths = []
+    postings = {}  # term -> [(document, frequency), ...], in document order
+    for number, (doc_id, tokens) in enumerate(documents):
+        ids.append(doc_id)
+        lengths.append(len(tokens))
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for term, tf in counts.items():
+            postings.setdefault(term, []).append((number, tf))
+
+    average = sum(lengths) / len(lengths) if lengths else 0.0
+    terms = sorted((term.encode('utf-8'), term) for term in postings)
+    table = bytearray()
+    text = bytearray()
+    encoded = bytearray()
+    for raw, term in terms:
+        table += TERM.pack(len(text), len(raw), len(encoded), len(postings[term]))
+        text += raw
+        previous = 0
+        for number, tf in postings[term]:
+            _varint(number - previous, encoded)
+            _varint(tf, encoded)
+            previous = number
+    raw_ids = [doc_id.encode('utf-8') for doc_id in ids]
+    id_offsets = array('I', [0])
+    for raw in raw_ids:
+        id_offsets.append(id_offsets[-1] + len(raw))
+
+    norms = array('d', _norms(lengths, k1, b, average))
+
+    body = bytearray()
+    offsets = []
+    for section in (table, text, encoded, array('I', lengths).tobytes(), norms.tobytes(),
+                    id_offsets.tobytes(), b''.join(raw_ids)):
+        offsets.append(HEADER.size + len(body))
+        body += section
+        _align(body)
+    header = HEADER.pack(MAGIC, analyzer.name.encode('ascii'), len(ids), len(terms),
+                         k1, b, average, *offsets)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(header)
+        f.write(body)
+    os.replace(tmp, path)
+    return len(ids)
+
+
+class BM25Index:
+    """A BM25 index file opened through mmap."""
+
+    def __init__(self, path):
+        if sys.byteorder != 'little':
+            raise ValueError("BM25 index files are read on little-endian hosts only")
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+        (magic, analyzer, self.documents, self.terms, self.k1, self.b, self.average,
+         table, text, postings, lengths, norms, id_offsets, ids) = HEADER.unpack_from(view)
+        try:
+            if magic != MAGIC:
+                raise ValueError(f"{path}: not a BM25 index of this version")
+            self.analyzer = get_analyzer(analyzer.rstrip(b'\x00').decode('ascii'))
+        except ValueError:
+            view.release()
+            self._map.close()
+            raise
+        self._table = view[table:table + TERM.size * self.terms].cast('I')
+        self._text = view[text:postings]
+        self._postings = view[postings:lengths]
+        self._lengths = view[lengths:lengths + 4 * self.documents].cast('I')
+        self._norms = view[norms:norms + 8 * self.documents].cast('d')
+        self._other = None  # (average length, array('d') of its norms), the last asked for
+        self._id_offsets = view[id_offsets:id_offsets + 4 * (self.documents + 1)].cast('I')
+        self._ids = view[ids:]
+
+    def close(self):
+        for name in ('_table', '_text', '_postings', '_lengths', '_norms', '_id_offsets', '_ids'):
+            view = self.__dict__.pop(name, None)
+            if view is not None:
+                view.release()
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def doc_id(self, number):
+        start, end = self._id_offsets[number], self._id_offsets[number + 1]
+        return bytes(self._ids[start:end]).decode('utf-8')
+
+    def length(self, number):
+        """Term count of a document."""
+        return self._lengths[number]
+
+    def lookup(self, term):
+        """(postings offset, document frequency) of a term, or None."""
+        key = term.encode('utf-8')
+        table, text = self._table, self._text
+        low, high = 0, self.terms
+        while low < high:
+            middle = (low + high) // 2
+            start = table[4 * middle]
+            found = text[start:start + table[4 * middle + 1]].tobytes()
+            if found < key:
+                low = middle + 1
+            elif found > key:
+                high = middle
+            else:
+                return table[4 * middle + 2], table[4 * middle + 3]
+        return None
+
+    def term_counts(self):
+        """{term: frequency} of every document, decoded from all the postings."""
+        counts = [{} for _ in range(self.documents)]
+        table, text = self._table, self._text
+        for i in range(0, 4 * self.terms, 4):
+            start = table[i]
+            term = text[start:start + table[i + 1]].tobytes().decode('utf-8')
+            for number, tf in self._decode(table[i + 2], table[i + 3]):
+                counts[number][term] = tf
+        return counts
+
+    def postings(self, term):
+        """Yields the (document number, term frequency) pairs of a term."""
+        entry = self.lookup(term)
+        return self._decode(*entry) if entry else iter(())
+
+    def _decode(self, position, count):
+        data = self._postings
+        number = 0
+        for _ in range(count):
+            pair = []
+            for _ in range(2):
+                value = data[position]
+                position += 1
+                if value >= 0x80:  # rare: more than one byte
+                    value &= 0x7f
+                    shift = 7
+                    while True:
+                        byte = data[position]
+                        position += 1
+                        value |= (byte & 0x7f) << shift
+                        if byte < 0x80:
+                            break
+                        shift += 7
+                pair.append(value)
+            number += pair[0]
+            yield number, pair[1]
+
+    def idf(self, df):
+        return math.log(1 + (self.documents - df + 0.5) / (df + 0.5))
+
+    def norms(self, average=None):
+        """k1 * (1 - b + b * length / average) per document; average defaults to this index's."""
+        if average is None or average == self.average:
+            return self._norms
+        if self._other is None or self._other[0] != average:
+            self._other = average, array('d', _norms(self._lengths, self.k1, self.b, average))
+        return self._other[1]
+
+    def add_scores(self, weighted, norms, scores):
+        """Adds to {document number: score} the BM25 terms of (postings, idf) pairs.
+
+        postings are (document number, term frequency) pairs of a term.
+        """
+        boost = self.k1 + 1
+        for postings, idf in weighted:
+            for number, tf in postings:
+                scores[number] = scores.get(number, 0.0) + idf * tf * boost / (tf + norms[number])
+        return scores
+
+    def scores(self, terms):
+        """{document number: BM25 score} of the documents matching any term."""
+        weighted = []
+        for term in set(terms):
+            entry = self.lookup(term)
+            if entry is not None:
+                weighted.append((self._decode(*entry), self.idf(entry[1])))
+        return self.add_scores(weighted, self.norms(), {})
+
+    def search(self, terms, k=10):
+        """The k best (chunk id, score) pairs for query terms, best first."""
+        best = heapq.nlargest(k, self.scores(terms).items(), key=lambda item: item[1])
+        return [(self.doc_id(number), score) for number, score in best]
+
+    def search_text(self, text, k=10):
+        """search() for the terms the index's analyzer finds in text."""
+        return self.search(self.analyzer(text), k)
+
+
+def build_index(chunks_path=DEFAULT_CHUNKS, index_path=DEFAULT_INDEX, k1=K1, b=B,
+                analyzer=ANALYZER):
+    """Indexes a chunks.jsonl file (see mdtex.chunks); returns the chunk count."""
+    documents = ((chunk.id, analyzer(chunk_text(chunk))) for chunk in read_chunks(chunks_path))
+    return write_index(documents, index_path, k1, b, analyzer)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m mdtex.bm25',
+                                     description='Build or query the BM25 index of the chunks.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='index a chunks.jsonl file')
+    build.add_argument('--chunks', default=DEFAULT_CHUNKS)
+    build.add_argument('--index', default=DEFAULT_INDEX)
+    build.add_argument('--k1', type=float, default=K1)
+    build.add_argument('--b', type=float, default=B)
+    query = commands.add_parser('query', help='print the best chunks for a query')
+    query.add_argument('text')
+    query.add_argument('--index', default=DEFAULT_INDEX)
+    query.add_argument('-k', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        start = time.perf_counter()
+        count = build_index(args.chunks, args.index, args.k1, args.b)
+        print(f"{args.index}: {count} chunks, {os.path.getsize(args.index)} bytes, "
+              f"{(time.perf_counter() - start) * 1000:.1f} ms")
+        return 0
+
+    start = time.perf_counter()
+    with BM25Index(args.index) as index:
+        opened = time.perf_counter()
+        terms = index.analyzer(args.text)
+        results = index.search(terms, args.k)
+        done = time.perf_counter()
+    for doc_id, score in results:
+        print(f"{score:8.3f}  {doc_id}")
+    print(f"open {(opened - start) * 1e3:.2f} ms, query {(done - opened) * 1e6:.0f} us "
+          f"({len(set(terms))} terms)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+"""Batch build of every informe_final document listed in the manifest.
+
+    python -m mdtex.build                 # all jobs, one worker per core
+    python -m mdtex.build cap2 ANEXO-C    # selected jobs (profile or file name)
+    python -m mdtex.build -j 1            # sequential, in-process
+    python -m mdtex.build --force         # ignore the recorded hashes
+    python -m mdtex.build --no-cache      # render every block from scratch
+    python -m mdtex.build --split-above 0 # never split a document across workers
+    python -m mdtex.build --trace out     # out.json + out.folded stage timings (uncached)
+
+Jobs whose input, profile and engine hashes match the last successful build
+(see mdtex.state) are skipped. Within the jobs that do run, documents whose
+source did not change are not parsed again (mdtex.parsecache), and blocks
+whose Markdown was already converted come from the block cache (mdtex.cache).
+Large documents are split at their sections and converted by all workers.
+Labels are made unique across the report and numbered captions mentioned
+in the text become \\ref (mdtex.labels).
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from . import engine
+from .cache import DEFAULT_MAX_BYTES, BlockCache
+from .labels import index_labels
+from .parsecache import ParseCache
+from .state import STATE_FILE, BuildState
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+DEFAULT_MANIFEST = os.path.join(REPO_ROOT, 'docs', 'informe_final', 'manifest.json')
+CACHE_FILE = os.path.join('.mdtex-cache', 'blocks.sqlite')
+PARSE_CACHE_DIR = os.path.join('.mdtex-cache', 'parsed')
+
+# Inputs at least this large are split into sections across the workers
+SPLIT_ABOVE = 32 * 1024
+
+Job = namedtuple('Job', 'input output profile')
+JobResult = namedtuple('JobResult', 'job seconds error status')
+
+# JobResult.status values
+WRITTEN, UNCHANGED, SKIPPED, FAILED = 'written', 'unchanged', 'skipped', 'failed'
+
+
+def load_manifest(path=DEFAULT_MANIFEST):
+    """Reads the job list; paths are relative to the manifest's directory."""
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    return [
+        Job(os.path.join(base, entry['input']),
+            os.path.join(base, entry['output']),
+            entry['profile'])
+        for entry in manifest['jobs']
+    ]
+
+
+def _job_names(job):
+    name = os.path.basename(job.input)
+    return {job.profile, name, os.path.splitext(name)[0]}
+
+
+def select_jobs(jobs, names):
+    """Keeps the jobs matching a profile name or an input file name."""
+    if not names:
+        return jobs
+    wanted = set(names)
+    selected = [job for job in jobs if _job_names(job) & wanted]
+    unknown = wanted.difference(*map(_job_names, selected))
+    if unknown:
+        raise ValueError(f"No manifest job for: {', '.join(sorted(unknown))}")
+    return selected
+
+
+def convert_job(job, blocks=None, parsed=None, pool=None, labels=None):
+    """Converts one job with an open BlockCache and ParseCache, if any, or
+    with its sections on an executor, and its DocumentLabels."""
+    start = time.perf_counter()
+    try:
+        written = engine.convert_file(job.input, job.output, job.profile, blocks,
+                                      parsed=parsed, pool=pool, labels=labels)
+    except Exception as e:
+        return JobResult(job, time.perf_counter() - start,
+                         f"{type(e).__name__}: {e}", FAILED)
+    return JobResult(job, time.perf_counter() - start, None,
+                     WRITTEN if written else UNCHANGED)
+
+
+def run_job(job, cache=None, parsed=None, labels=None):
+    """Converts one job.
+
+    cache is an optional (path, max_bytes) pair for the block cache and
+    parsed an optional parse cache directory.
+    """
+    parsed = ParseCache(parsed) if parsed else None
+    if not cache:
+        return convert_job(job, None, parsed, labels=labels)
+    with BlockCache(*cache) as blocks:
+        return convert_job(job, blocks, parsed, labels=labels)
+
+
+def _labels(registry, job):
+    return registry.document(os.path.basename(job.input)) if registry else None
+
+
+def run_jobs(jobs, workers=None, cache=None, parsed=None, split_above=SPLIT_ABOVE,
+             registry=None):
+    """Runs the jobs on a process pool and returns results in job order.
+
+    The largest inputs are submitted first so that the slowest chapter
+    starts right away and bounds the wall time. Inputs of split_above
+    bytes or more (0: none) are not converted as one task: this process
+    splits them into sections for the workers (engine.iter_convert_sections)
+    and writes their output, without the caches. With a LabelRegistry,
+    each document's labels are rewritten by it.
+    """
+    workers = workers or os.cpu_count() or 1
+    order = sorted(range(len(jobs)), key=lambda i: -_size(jobs[i].input))
+    split = {i for i in order if split_above and _size(jobs[i].input) >= split_above}
+    if workers == 1 or len(jobs) <= 1 and not split:
+        return [run_job(job, cache, parsed, _labels(registry, job)) for job in jobs]
+
+    with ProcessPoolExecutor(max_workers=workers if split else min(workers, len(jobs))) as pool:
+        futures = {i: pool.submit(run_job, jobs[i], cache, parsed, _labels(registry, jobs[i]))
+                   for i in order if i not in split}
+        results = {i: convert_job(jobs[i], pool=pool, labels=_labels(registry, jobs[i]))
+                   for i in order if i in split}
+        return [results[i] if i in split else futures[i].result() for i in range(len(jobs))]
+
+
+def build(jobs, workers=None, state=None, force=False, cache=None, parsed=None,
+          split_above=SPLIT_ABOVE, registry=None):
+    """Converts the jobs that changed since the last build, in manifest order.
+
+    With a BuildState, up-to-date jobs come back as SKIPPED and the state
+    is updated and saved for every job that succeeded.
+    """
+    if state is None:
+        return run_jobs(jobs, workers, cache, parsed, split_above, registry)
+
+    fingerprints = [state.fingerprint(job, _labels(registry, job)) for job in jobs]
+    stale = [i for i, job in enumerate(jobs)
+             if force or not state.is_fresh(job, fingerprints[i])]
+
+    results = [JobResult(job, 0.0, None, SKIPPED) for job in jobs]
+    for i, result in zip(stale, run_jobs([jobs[i] for i in stale], workers, cache, parsed,
+                                         split_above, registry)):
+        results[i] = result
+        if not result.error:
+            state.record(result.job, fingerprints[i])
+    if stale:
+        state.save()
+    return results
+
+
+def _size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def print_summary(results, wall, out=sys.stdout):
+    width = max((len(os.path.basename(r.job.input)) for r in results), default=0)
+    for r in results:
+        name = os.path.basename(r.job.input).ljust(width)
+        status = f"FAILED {r.error}" if r.error else r.status
+        print(f"  {name}  {r.job.profile:<8} {r.seconds * 1000:8.1f} ms  {status}", file=out)
+    counts = {status: sum(1 for r in results if r.status == status)
+              for status in (WRITTEN, UNCHANGED, SKIPPED, FAILED)}
+    busy = sum(r.seconds for r in results)
+    print(f"{len(results)} jobs: {counts[WRITTEN]} written, {counts[UNCHANGED]} unchanged, "
+          f"{counts[SKIPPED]} skipped, {counts[FAILED]} failed; "
+          f"{wall * 1000:.1f} ms wall ({busy * 1000:.1f} ms of conversion)", file=out)
+
+
+def add_build_arguments(parser):
+    """Adds the manifest, state and cache options shared with mdtex.watch."""
+    parser.add_argument('names', nargs='*', help='profiles or file names to build (default: all)')
+    parser.add_argument('--manifest', default=DEFAULT_MANIFEST)
+    parser.add_argument('--state', default=None,
+                        help=f'build state file (default: {STATE_FILE} next to the manifest)')
+    parser.add_argument('--cache', default=None,
+                        help=f'block cache file (default: {CACHE_FILE} next to the manifest)')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_BYTES // 2**20,
+                        help='block cache size limit in MiB (default: %(default)s)')
+    parser.add_argument('--parse-cache', default=None,
+                        help=f'parse cache directory (default: {PARSE_CACHE_DIR} next to the manifest)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='convert without the block and parse caches')
+
+
+def load_settings(parser, args):
+    """Returns (jobs, state, cache, parsed) for the add_build_arguments options."""
+    try:
+        jobs = select_jobs(load_manifest(args.manifest), args.names)
+    except (OSError, ValueError, KeyError) as e:
+        parser.error(str(e))
+
+    base = os.path.dirname(os.path.abspath(args.manifest))
+    state = BuildState.load(args.state or os.path.join(base, STATE_FILE))
+    cache = parsed = None
+    if not args.no_cache:
+        cache = (args.cache or os.path.join(base, CACHE_FILE), args.cache_size * 2**20)
+        parsed = args.parse_cache or os.path.join(base, PARSE_CACHE_DIR)
+    return jobs, state, cache, parsed
+
+
+def load_labels(manifest, parsed=None, out=sys.stderr):
+    """LabelRegistry of every manifest document, selected or not."""
+    registry = index_labels(load_manifest(manifest), ParseCache(parsed) if parsed else None)
+    for name, label, unique in registry.duplicates:
+        print(f"{name}: duplicate label {label} renamed {unique}", file=out)
+    return registry
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m mdtex.build',
+                                     description='Convert every informe_final document.')
+    add_build_arguments(parser)
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='worker processes (default: one per core)')
+    parser.add_argument('--split-above', type=int, default=SPLIT_ABOVE // 1024, metavar='KIB',
+                        help='split inputs this large across the workers, 0 for never '
+                             '(default: %(default)s)')
+    parser.add_argument('--force', action='store_true',
+                        help='rebuild every selected job regardless of recorded hashes')
+    parser.add_argument('--trace', metavar='PREFIX', default=None,
+                        help='record per-stage timings and counters to PREFIX.json and '
+                             'PREFIX.folded; runs every selected job in-process, without '
+                             'the caches, so that every stage is timed')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='with --trace, also record tracemalloc peaks per document')
+    args = parser.parse_args(argv)
+    jobs, state, cache, parsed = load_settings(parser, args)
+
+    start = time.perf_counter()
+    registry = load_labels(args.manifest, parsed)
+    if args.trace:
+        from . import instrument
+        # Cache hits would leave out the stages being profiled
+        with instrument.record(memory=args.trace_memory) as recorder:
+            results = build(jobs, 1, state, True, registry=registry)
+        recorder.write_json(args.trace + '.json')
+        recorder.write_collapsed(args.trace + '.folded')
+    else:
+        results = build(jobs, args.jobs, state, args.force, cache, parsed,
+                        args.split_above * 1024, registry)
+    print_summary(results, time.perf_counter() - start)
+    return 1 if any(r.status == FAILED for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""Size-bounded cache of rendered blocks, in memory and on disk."""
+
+import marshal
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MEMORY_ENTRIES = 4096
+FLUSH_EVERY = 1024
+# A hit refreshes a row's last-use time only if it is older than this many
+# seconds: eviction order does not need more precision than that
+TOUCH_AFTER = 3600
+# Bumped when the table layout or the value encoding changes
+SCHEMA_VERSION = 2
+
+# Triggers keep the total size of the values in the 'total' meta row
+_SCHEMA = (
+    'DROP TABLE IF EXISTS blocks',
+    'DROP TABLE IF EXISTS meta',
+    'CREATE TABLE blocks (key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+    'size INTEGER NOT NULL, used REAL NOT NULL)',
+    'CREATE INDEX blocks_used ON blocks (used)',
+    'CREATE TABLE meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)',
+    "INSERT INTO meta VALUES ('total', 0)",
+    "CREATE TRIGGER blocks_insert AFTER INSERT ON blocks BEGIN "
+    "UPDATE meta SET value = value + new.size WHERE name = 'total'; END",
+    "CREATE TRIGGER blocks_update AFTER UPDATE OF size ON blocks BEGIN "
+    "UPDATE meta SET value = value + new.size - old.size WHERE name = 'total'; END",
+    "CREATE TRIGGER blocks_delete AFTER DELETE ON blocks BEGIN "
+    "UPDATE meta SET value = value - old.size WHERE name = 'total'; END",
+)
+
+
+class BlockCache:
+    """Maps block keys to the LaTeX lines they render to.
+
+    Entries are kept in an in-process LRU and, when a path is given, in a
+    SQLite file bounded to max_bytes. The least recently used rows are
+    evicted first. Writes and access times are batched until flush().
+    Values are stored marshalled, and triggers keep the total size in a
+    meta row, so neither a lookup nor a flush reads more than its rows.
+    """
+
+    def __init__(self, path=None, max_bytes=DEFAULT_MAX_BYTES,
+                 memory_entries=DEFAULT_MEMORY_ENTRIES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._pending = {}
+        self._touched = set()
+        self._used = {}  # key -> last-use time stored in the database
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, timeout=30)
+            # A lost write only costs a re-render, so skip the fsyncs
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=OFF')
+            if self._db.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+                self._create()
+
+    def _create(self):
+        # Another worker may be creating it too: check again under the write lock
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            if db.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+                for statement in _SCHEMA:
+                    db.execute(statement)
+                db.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            db.commit()
+        except BaseException:
+            db.rollback()
+            raise
+
+    def get(self, key):
+        """Returns the cached lines for key, or None."""
+        lines = self._memory.get(key)
+        if lines is not None:
+            self._memory.move_to_end(key)
+            self._touched.add(key)
+            self.hits += 1
+            return lines
+        if self._db is not None:
+            row = self._db.execute(
+                'SELECT value, used FROM blocks WHERE key = ?', (key,)).fetchone()
+            if row:
+                lines = marshal.loads(row[0])
+                self._used[key] = row[1]
+                self._remember(key, lines)
+                self._touched.add(key)
+                self.hits += 1
+                return lines
+        self.misses += 1
+        return None
+
+    def put(self, key, lines):
+        self._remember(key, lines)
+        if self._db is not None:
+            self._pending[key] = marshal.dumps(lines)
+            if len(self._pending) >= FLUSH_EVERY:
+                self.flush()
+
+    def _remember(self, key, lines):
+        self._memory[key] = lines
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def flush(self):
+        """Writes pending entries and access times, then evicts down to max_bytes."""
+        if self._db is None or not (self._pending or self._touched):
+            return
+        now = time.time()
+        stale = [(now, k) for k in self._touched - self._pending.keys()
+                 if now - self._used.get(k, 0.0) > TOUCH_AFTER]
+        if self._pending or stale:
+            with self._db:
+                self._db.executemany(
+                    'INSERT INTO blocks (key, value, size, used) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT (key) DO UPDATE SET value = excluded.value, '
+                    'size = excluded.size, used = excluded.used',
+                    [(k, v, len(v), now) for k, v in self._pending.items()])
+                self._db.executemany('UPDATE blocks SET used = ? WHERE key = ?', stale)
+                if self._pending:
+                    self._evict()
+            self._used.update((k, now) for k in self._pending)
+            self._used.update((k, now) for _, k in stale)
+        self._pending.clear()
+        self._touched.clear()
+
+    def _evict(self):
+        total = self._db.execute("SELECT value FROM meta WHERE name = 'total'").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        doomed = []
+        for key, size in self._db.execute('SELECT key, size FROM blocks ORDER BY used'):
+            doomed.append((key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+        self._db.executemany('DELETE FROM blocks WHERE key = ?', doomed)
+        for (key,) in doomed:
+            self._memory.pop(key, None)
+            self._used.pop(key, None)
+
+    def close(self):
+        self.flush()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
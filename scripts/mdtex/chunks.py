@@ -0,0 +1,264 @@
+"""Heading-bounded chunks of the Markdown corpus, for retrieval.
+
+    python -m mdtex.chunks                         # docs/pmbok + docs/informe_final
+    python -m mdtex.chunks docs/pmbok --max-tokens 300 --overlap 32
+
+Files are cut where the converter's parser cuts them into blocks (see
+engine.split_blocks), so a chunk never ends inside a list, table or code
+block unless that block alone is over the token budget. A heading always
+starts a new chunk; within a section, chunks of up to max_tokens repeat the
+last overlap tokens' worth of lines of the previous one.
+
+The chunks are written as JSON Lines, one compact object per chunk:
+
+    {"id": "PRINCIPLES:3", "source": "docs/pmbok/PRINCIPLES.md",
+     "path": ["Principles", "Stewardship"], "lines": [12, 18],
+     "bytes": [904, 1377], "tokens": 118, "text": "## Stewardship\\n..."}
+
+path is the chain of headings above the chunk, lines the first and last
+source line (1-based) and bytes the UTF-8 byte range of the text in the
+source file. tokens is an estimate (estimate_tokens()).
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import namedtuple
+
+from . import ir
+from .backends import plain_inline
+from .build import REPO_ROOT, load_manifest
+from .engine import Parser, read_lines, split_blocks
+from .profiles import Profile, get_profile
+
+DEFAULT_PATHS = (os.path.join(REPO_ROOT, 'docs', 'pmbok'),
+                 os.path.join(REPO_ROOT, 'docs', 'informe_final'))
+DEFAULT_OUTPUT = os.path.join(REPO_ROOT, 'docs', 'retrieval', 'chunks.jsonl')
+MAX_TOKENS = 400
+OVERLAP_TOKENS = 48
+
+# Markdown files outside the manifest are parsed with the defaults
+MARKDOWN = Profile('markdown')
+
+# Rough size of a token in characters, for Spanish and English prose
+CHARS_PER_TOKEN = 4
+
+Chunk = namedtuple('Chunk', 'id source path lines bytes tokens text')
+
+
+def estimate_tokens(text):
+    """Token count estimate of text, from its length."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def _pieces(lines, profile):
+    # (first line index, source lines, heading or None) of the runs of
+    # lines of each block between headings. Blocks that start inside a
+    # long table carry its header line first, which is not theirs in the
+    # source.
+    position = 0
+    for block, nodes in split_blocks(lines, profile):
+        skip = 1 if nodes and type(nodes[0]) in (ir.TableRows, ir.TableEnd) else 0
+        starts = [(0, None)]
+        if any(type(node) is ir.Heading for node in nodes):
+            # A heading may follow other lines of its block: parse the
+            # block again, which a fresh parser does the same, to find it
+            parser = Parser(profile)
+            for offset, line in enumerate(block):
+                count = len(parser.nodes)
+                parser.feed(line)
+                if len(parser.nodes) > count and type(parser.nodes[-1]) is ir.Heading:
+                    starts.append((offset - skip, parser.nodes[-1]))
+            if starts[1][0] == 0:
+                del starts[0]
+        block = block[skip:]
+        ends = [start for start, _ in starts[1:]] + [len(block)]
+        for (start, heading), end in zip(starts, ends):
+            yield position + start, block[start:end], heading
+        position += len(block)
+
+
+class _Section:
+    """Lines of the chunk being filled, with the line numbers they come from."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lines = []  # (index, line, tokens)
+        self.tokens = 0
+        self.body = False  # holds lines of more than headings, besides the overlap
+
+    def add(self, index, line):
+        tokens = estimate_tokens(line) + 1  # and its newline
+        self.lines.append((index, line, tokens))
+        self.tokens += tokens
+
+    def tail(self, overlap):
+        """A section holding the last lines of this one, up to overlap tokens."""
+        following = _Section(self.path)
+        kept = []
+        budget = overlap
+        for entry in reversed(self.lines):
+            if entry[2] > budget:
+                break
+            budget -= entry[2]
+            kept.append(entry)
+        for index, line, _ in reversed(kept):
+            following.add(index, line)
+        return following
+
+
+def chunk_lines(lines, profile=MARKDOWN, max_tokens=MAX_TOKENS, overlap=OVERLAP_TOKENS):
+    """Yields (heading path, first line index, lines) of the chunks of a document."""
+    profile = get_profile(profile)
+    headings = []  # (level, text) of the enclosing headings
+    section = _Section(())
+
+    def flush(section):
+        entries = section.lines
+        while entries and not entries[0][1].strip():
+            entries = entries[1:]
+        while entries and not entries[-1][1].strip():
+            entries = entries[:-1]
+        if section.body and entries:
+            return section.path, entries[0][0], [line for _, line, _ in entries]
+        return None
+
+    for first, piece, heading in _pieces(lines, profile):
+        if heading is not None:
+            chunk = flush(section)
+            if chunk:
+                yield chunk
+            while headings and headings[-1][0] >= heading.level:
+                headings.pop()
+            headings.append((heading.level, plain_inline(heading.text.strip())))
+            section = _Section(tuple(text for _, text in headings))
+        content = piece[1:] if heading is not None else piece
+        tokens = sum(estimate_tokens(line) + 1 for line in piece)
+
+        # A block that does not fit starts the next chunk, without the
+        # overlap if that would not leave it room
+        if section.body and section.tokens + tokens > max_tokens:
+            chunk = flush(section)
+            if chunk:
+                yield chunk
+            section = section.tail(overlap)
+            if section.tokens + tokens > max_tokens:
+                section = _Section(section.path)
+        if section.tokens + tokens <= max_tokens:
+            for index, line in enumerate(piece, first):
+                section.add(index, line)
+            section.body = section.body or any(line.strip() for line in content)
+            continue
+
+        # Only a block over the budget by itself is cut between lines
+        for index, line in enumerate(piece, first):
+            if section.body and section.tokens + estimate_tokens(line) + 1 > max_tokens:
+                chunk = flush(section)
+                if chunk:
+                    yield chunk
+                section = section.tail(overlap)
+            section.add(index, line)
+            section.body = section.body or bool(line.strip()) and not (
+                heading is not None and index == first)
+    chunk = flush(section)
+    if chunk:
+        yield chunk
+
+
+def chunk_file(path, profile=MARKDOWN, max_tokens=MAX_TOKENS, overlap=OVERLAP_TOKENS,
+               root=REPO_ROOT):
+    """Yields the Chunks of a Markdown file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = list(read_lines(f))
+    starts = [0]  # byte offset of each line
+    for line in lines:
+        starts.append(starts[-1] + len(line.encode('utf-8')) + 1)
+    source = os.path.relpath(path, root).replace(os.sep, '/')
+    stem = os.path.splitext(os.path.basename(path))[0]
+    for n, (heading_path, first, chunk) in enumerate(
+            chunk_lines(lines, profile, max_tokens, overlap), 1):
+        text = '\n'.join(chunk)
+        last = first + len(chunk) - 1
+        yield Chunk(f'{stem}:{n}', source, list(heading_path), [first + 1, last + 1],
+                    [starts[first], starts[last + 1] - 1], estimate_tokens(text), text)
+
+
+def markdown_files(paths):
+    """The .md files under paths, in sorted order."""
+    for path in paths:
+        if os.path.isfile(path):
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith('.md'):
+                    yield os.path.join(root, name)
+
+
+def manifest_profiles(paths):
+    """{input path: profile name} of the manifests next to the files under paths."""
+    profiles = {}
+    for directory in {os.path.dirname(os.path.abspath(p)) if os.path.isfile(p)
+                      else os.path.abspath(p) for p in paths}:
+        manifest = os.path.join(directory, 'manifest.json')
+        if os.path.exists(manifest):
+            profiles.update((os.path.abspath(job.input), job.profile)
+                            for job in load_manifest(manifest))
+    return profiles
+
+
+def chunk_paths(paths=DEFAULT_PATHS, max_tokens=MAX_TOKENS, overlap=OVERLAP_TOKENS):
+    """Yields the Chunks of every Markdown file under paths.
+
+    Documents of a manifest are parsed with their conversion profile.
+    """
+    profiles = manifest_profiles(paths)
+    for path in markdown_files(paths):
+        profile = profiles.get(os.path.abspath(path), MARKDOWN)
+        yield from chunk_file(path, profile, max_tokens, overlap)
+
+
+def write_chunks(chunks, path):
+    """Writes chunks as JSON Lines; returns how many."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    count = 0
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        for chunk in chunks:
+            f.write(json.dumps(chunk._asdict(), ensure_ascii=False, separators=(',', ':')))
+            f.write('\n')
+            count += 1
+    os.replace(tmp, path)
+    return count
+
+
+def read_chunks(path):
+    """Yields the Chunks of a JSON Lines file written by write_chunks()."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            yield Chunk(**json.loads(line))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m mdtex.chunks',
+                                     description='Split the Markdown corpus into retrieval chunks.')
+    parser.add_argument('paths', nargs='*', default=list(DEFAULT_PATHS))
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--max-tokens', type=int, default=MAX_TOKENS,
+                        help='estimated tokens per chunk (default: %(default)s)')
+    parser.add_argument('--overlap', type=int, default=OVERLAP_TOKENS,
+                        help='estimated tokens repeated from the previous chunk of a '
+                             'section (default: %(default)s)')
+    args = parser.parse_args(argv)
+    if not 0 <= args.overlap < args.max_tokens:
+        parser.error('--overlap must be at least 0 and below --max-tokens')
+
+    count = write_chunks(chunk_paths(args.paths, args.max_tokens, args.overlap), args.output)
+    print(f"{args.output}: {count} chunks")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""Column specs planned from the cells of each table.
+
+column_stats() measures every column in one pass over a table's cells:
+maximum, median and 90th percentile display width, the share of cells
+that read as prose rather than short codes (IDs, dates, marks) and the
+widest word.
+ColumnPlanner turns those into l, c, p{} and X columns that fit the text
+width, instead of a spec tuned by hand for each document.
+"""
+
+import math
+import unicodedata
+from array import array
+from dataclasses import dataclass
+from functools import lru_cache
+
+# Inline markup that takes no room on the page
+_MARKUP = str.maketrans('', '', '*`')
+
+# A cell with this many words or more is prose
+PROSE_WORDS = 4
+
+
+@lru_cache(maxsize=4096)
+def _char_width(char):
+    if unicodedata.combining(char) or unicodedata.category(char) in ('Mn', 'Me', 'Cf'):
+        return 0  # accents, variation selectors, zero-width joiners
+    return 2 if unicodedata.east_asian_width(char) in ('W', 'F') else 1
+
+
+def display_widths(texts):
+    """Widths of texts in character cells, as an array.
+
+    Wide characters (CJK, most emoji) count two and combining marks none.
+    ASCII texts, the common case, are measured by len() alone.
+    """
+    widths = array('I', map(len, texts))
+    for i, text in enumerate(texts):
+        if not text.isascii():
+            widths[i] = sum(map(_char_width, text))
+    return widths
+
+
+@dataclass(frozen=True)
+class ColumnStats:
+    max: int
+    median: int
+    p90: int
+    prose: float  # share of non-empty cells with PROSE_WORDS words or more
+    word: int  # widest word, the least a wrapped column can take
+
+
+def column_stats(rows, num_cols):
+    """ColumnStats of the first num_cols columns of rows of raw cells."""
+    columns = [[] for _ in range(num_cols)]
+    for row in rows:
+        for column, cell in zip(columns, row):
+            column.append(cell.translate(_MARKUP))
+    stats = []
+    for cells in columns:
+        widths = sorted(display_widths(cells)) or [0]
+        filled = [cell for cell in cells if cell]
+        words = [cell.split() for cell in filled]
+        prose = sum(len(split) >= PROSE_WORDS for split in words)
+        word = max(display_widths([w for split in words for w in split]), default=0)
+        n = len(widths)
+        stats.append(ColumnStats(widths[-1], widths[(n - 1) // 2], widths[min(n - 1, n * 9 // 10)],
+                                 prose / len(filled) if filled else 0.0, word))
+    return stats
+
+
+@dataclass(frozen=True)
+class ColumnPlanner:
+    """A column spec builder that sizes columns from the table's cells.
+
+    The kind of a column is decided by its body cells: short codes (half
+    of the cells at most code_width wide and not prose) stay on one line,
+    l or c, and the header only widens them. A table whose columns fit
+    side by side on one line each gets l and c columns throughout.
+    Otherwise the other columns wrap in p{} columns, sharing the remaining
+    width by their 90th percentile width; if that leaves them less than
+    wrap_share of the line, the widest code columns wrap too. With stretch
+    (tabularx) the widest column that would wrap, or the widest column
+    of a table that fits, is an X column instead.
+
+    Column specs of TableRules still take precedence.
+    """
+    ruled: bool = True
+    stretch: bool = False
+    text_width: float = 15.0  # cm
+    char_width: float = 0.18  # cm per character of table text
+    padding: float = 0.4  # cm between columns (2 \tabcolsep)
+    center_width: int = 3  # columns at most this wide are centred
+    code_width: int = 16  # median width of code columns, at most
+    min_width: float = 1.5  # cm, narrowest p{} column, if its words fit
+    wrap_share: float = 0.5  # least share of the line left to wrapping columns
+
+    def __call__(self, num_cols, cells=None):
+        if not cells:
+            return self.spec(['X' if self.stretch and i == num_cols - 1 else 'l'
+                              for i in range(num_cols)])
+        return self.spec(self.plan(cells[0][:num_cols], cells[1:]))
+
+    def spec(self, kinds):
+        if self.ruled:
+            return '|' + '|'.join(kinds) + '|'
+        return ''.join(kinds)
+
+    def plan(self, headers, rows):
+        """Column kinds for a header row and body rows of raw cells."""
+        num_cols = len(headers)
+        if not rows:
+            rows = [headers]
+        stats = column_stats(rows, num_cols)
+        heads = display_widths([h.translate(_MARKUP) for h in headers])
+        # On one line a column is as wide as its header too
+        line = [max(s.max, h) for s, h in zip(stats, heads)]
+        room = self.text_width - self.padding * num_cols  # cm for the text itself
+        kinds = ['c' if s.max <= self.center_width else 'l' for s in stats]
+        if sum(line) * self.char_width <= room:
+            if self.stretch:
+                # tabularx needs an X column to fill the line
+                kinds[max(range(num_cols), key=lambda i: (stats[i].p90, heads[i]))] = 'X'
+            return kinds
+
+        code = [i for i, s in enumerate(stats)
+                if s.median <= self.code_width and s.prose < 0.5]
+        wrap = [i for i in range(num_cols) if i not in code]
+        if not wrap:
+            wrap = [max(code, key=line.__getitem__)]
+            code.remove(wrap[0])
+        code.sort(key=line.__getitem__)
+        left = room - sum(line[i] for i in code) * self.char_width
+        while code and left < room * self.wrap_share:
+            widest = code.pop()
+            wrap.append(widest)
+            left += line[widest] * self.char_width
+
+        weights = {i: max(stats[i].p90, 1) for i in wrap}
+        least = {i: max(self.min_width, math.ceil(stats[i].word * self.char_width * 10) / 10)
+                 for i in wrap}
+        stretched = max(wrap, key=weights.__getitem__) if self.stretch else None
+        for i, width in self._share(left, weights, least).items():
+            # Rounded down, so that the columns never add up to more than the line
+            kinds[i] = 'X' if i == stretched else f'p{{{math.floor(width * 10) / 10:.1f}cm}}'
+        return kinds
+
+    @staticmethod
+    def _share(left, weights, least):
+        # left cm by weight, no column under its least width: those get it
+        # and the others share what remains
+        widths = {}
+        weights = dict(weights)
+        while weights:
+            total = sum(weights.values())
+            narrow = [i for i, w in weights.items() if left * w / total < least[i]]
+            if not narrow or len(narrow) == len(weights):
+                for i, w in weights.items():
+                    widths[i] = max(least[i], left * w / total)
+                break
+            for i in narrow:
+                widths[i] = least[i]
+                left -= least[i]
+                del weights[i]
+        return widths
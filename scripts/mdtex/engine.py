@@ -0,0 +1,582 @@
+import filecmp
+import hashlib
+import os
+import re
+from collections import deque
+from functools import lru_cache
+
+from . import ir
+from .backends import BACKENDS, render_fields
+from .fingerprint import engine_version, profile_digest, render_digest
+from .latex import escape_latex, make_formatter
+from .profiles import PROFILES, get_profile
+from .symbols import make_transliterator
+
+CAPTION_RE = re.compile(r'\*\*\[(.*?): (.*?)\]\*\*')
+
+CAPTION_PREFIXES = ('**[Figura', '**[Tabla')
+
+# LaTeX refuses itemize/enumerate nested deeper than four levels; deeper
+# items stay in the innermost list.
+MAX_LIST_DEPTH = 4
+
+# Body rows of a long table handed on at a time
+TABLE_CHUNK_ROWS = 256
+
+# A document split into sections goes to a pool in batches of sections of
+# at least this many lines, this many batches at a time
+SECTION_BATCH_LINES = 500
+SECTIONS_IN_FLIGHT = 16
+
+# With a block cache, inputs up to this size also get one entry for their
+# whole output, so an unchanged document costs a single lookup
+DOCUMENT_CACHE_BYTES = 1024 * 1024
+
+
+class Rules:
+    """Compiled patterns and formatters for one profile."""
+
+    def __init__(self, profile):
+        self.heading_re = re.compile(profile.heading_pattern)
+        self.unordered_re = re.compile(profile.unordered_pattern)
+        self.ordered_re = (re.compile(profile.ordered_pattern)
+                           if profile.ordered_pattern else None)
+        self.fmt, self.fmt_batch = make_formatter(
+            profile.escape, profile.code_spans, profile.checkboxes,
+            profile.symbols, profile.strict_symbols)
+        symbols = make_transliterator(profile.symbols, strict=profile.strict_symbols)
+        self.heading_fmt = {
+            'escape': escape_latex,
+            'inline': self.fmt,
+            'plain': str.strip,
+        }[profile.heading_text]
+        if symbols and profile.heading_text != 'inline':
+            self.heading_fmt = _then(self.heading_fmt, symbols)
+
+
+def _then(first, second):
+    return lambda text: second(first(text))
+
+
+@lru_cache(maxsize=None)
+def compile_rules(profile):
+    """Builds the rules for a profile once per process."""
+    return Rules(profile)
+
+
+class Parser:
+    """Line-driven Markdown state machine shared by all profiles.
+
+    Completed top-level nodes (see mdtex.ir) collect in self.nodes. An open
+    list, quote or code block is attached to its parent only when it
+    closes, so every node in self.nodes is final and can be rendered.
+    """
+
+    def __init__(self, profile):
+        self.profile = get_profile(profile)
+        self.rules = compile_rules(self.profile)
+        self.nodes = []
+        self.lists = []  # open lists, innermost last
+        self.indents = []  # indentation of each open list's items
+        self.quote = None
+        self.code = None
+        self.table = []
+        self.long_header = None  # header row of the long table being streamed
+        self.caption = None
+
+    def add(self, node):
+        parent = self.quote or (self.lists and self.lists[-1])
+        if parent:
+            parent.children.append(node)
+        else:
+            self.nodes.append(node)
+
+    def feed(self, line):
+        p = self.profile
+        line = line.rstrip()
+        stripped = line.strip()
+
+        # CODE BLOCKS (content)
+        if self.code:
+            if line.startswith('```'):
+                code, self.code = self.code, None
+                self.add(code)
+            else:
+                self.code.lines.append(line)
+            return
+
+        # TABLES (plain or blockquoted)
+        table_line = self._table_line(stripped)
+        if table_line is not None:
+            self.close_quote()
+            self.close_list()
+            self.table.append(table_line)
+            if self.long_header is not None:
+                if len(self.table) >= TABLE_CHUNK_ROWS:
+                    self.flush_table_rows()
+            elif (p.long_table_rows is not None
+                  and len(self.table) > p.long_table_rows + 2):
+                self.start_long_table()
+            return
+        if self.table or self.long_header is not None:
+            self.flush_table()
+
+        # CODE BLOCKS (opening fence)
+        if p.code_blocks and line.startswith('```'):
+            self.flush_caption()
+            self.code = ir.Code(line.strip('`').strip() or "text")
+            return
+
+        # MULTI-LINE BLOCKQUOTES
+        if p.quotes == 'block':
+            if stripped.startswith('> '):
+                if p.quotes_close_lists:
+                    self.close_list()
+                if not self.quote:
+                    self.quote = ir.Quote()
+                self.quote.children.append(ir.Line(stripped[2:].strip()))
+                return
+            self.close_quote()
+
+        # HEADERS
+        match = self.rules.heading_re.match(line)
+        if match:
+            self.flush_caption()
+            self.close_list()
+            self.add(ir.Heading(len(match.group(1)), match.group(2)))
+            return
+
+        # LISTS
+        match = self.rules.unordered_re.match(line)
+        kind = 'itemize'
+        if not match and self.rules.ordered_re:
+            match = self.rules.ordered_re.match(line)
+            kind = 'enumerate'
+        if match:
+            self.flush_caption()
+            indent = _indent(line) if p.nested_lists else 0
+            self.add_item(kind, indent, match.group(1))
+            return
+
+        # ONE-LINE BLOCKQUOTES / FIGURES / CAPTIONS
+        if p.quotes == 'line' and line.startswith('>'):
+            self.close_list()
+            content = line.lstrip('> ').strip()
+            if not content:
+                return
+            if p.captions and content.startswith(CAPTION_PREFIXES):
+                match = CAPTION_RE.match(content)
+                if p.captions == 'deferred':
+                    # Held until we know whether a table follows
+                    self.flush_caption()
+                    if match:
+                        self.caption = self._caption(match)
+                    return
+                if match:
+                    caption = self._caption(match)
+                    caption.placeholder = True
+                    self.add(caption)
+                    return
+            elif p.captions and content.startswith('*Sugerencia'):
+                self.add(ir.Remark(content))
+                return
+            self.flush_caption()
+            self.add(ir.Quote([ir.Line(content)]))
+            return
+
+        # NORMAL TEXT
+        self.flush_caption()
+        if not stripped:
+            if self.lists and not p.loose_lists:
+                self.close_list()
+                if not p.blank_after_list:
+                    return
+            self.add(ir.Blank())
+            return
+        if not p.list_continuation:
+            self.close_list()
+        self.add(ir.Paragraph(stripped if p.strip_paragraphs else line))
+
+    @property
+    def idle(self):
+        """True when no list, quote, table, code block or caption is pending."""
+        return not (self.lists or self.code or self.quote or self.table
+                    or self.long_header is not None or self.caption)
+
+    def finish(self):
+        if self.table or self.long_header is not None:
+            self.flush_table()
+        if self.code:
+            code, self.code = self.code, None
+            self.add(code)
+        self.close_quote()
+        self.close_list()
+        self.flush_caption()
+        return self.nodes
+
+    def add_item(self, kind, indent, text):
+        """Adds an item, opening and closing lists by its indentation.
+
+        Lists indented deeper than the open one nest inside it; shallower
+        items close the inner lists first. Only the innermost list is ever
+        touched, so opening and closing are O(1) at any depth.
+        """
+        lists, indents = self.lists, self.indents
+        while lists and indent < indents[-1]:
+            self.pop_list()
+        if lists and not (indent > indents[-1] and len(lists) < MAX_LIST_DEPTH):
+            if lists[-1].kind == kind:
+                lists[-1].children.append(ir.Item(text))
+                return
+            self.pop_list()
+        self.close_quote()
+        lists.append(ir.List(kind, [ir.Item(text)]))
+        indents.append(indent)
+
+    def pop_list(self):
+        """Closes the innermost list and attaches it to its parent."""
+        self.close_quote()
+        self.indents.pop()
+        self.add(self.lists.pop())
+
+    def close_list(self):
+        self.close_quote()
+        while self.lists:
+            self.pop_list()
+
+    def close_quote(self):
+        if self.quote:
+            node, self.quote = self.quote, None
+            self.add(node)
+
+    def flush_table(self):
+        if self.long_header is not None:
+            self.flush_table_rows()
+            self.add(ir.TableEnd())
+            self.long_header = None
+            return
+        self.add(ir.Table(self.table, self.caption))
+        self.table = []
+        self.caption = None
+
+    def start_long_table(self):
+        """Hands on the rows so far and streams the rest of the table."""
+        self.add(ir.TableHead(self.table, self.caption))
+        self.long_header = self.table[0]
+        self.table = []
+        self.caption = None
+
+    def flush_table_rows(self):
+        if self.table:
+            self.add(ir.TableRows(self.long_header, self.table))
+            self.table = []
+
+    def flush_caption(self):
+        if self.caption:
+            caption, self.caption = self.caption, None
+            self.add(caption)
+
+    def _table_line(self, stripped):
+        if self.profile.table is None:
+            return None
+        if stripped.startswith('|'):
+            return stripped
+        if self.profile.quoted_tables and stripped.startswith('>'):
+            content = stripped.lstrip('> ').strip()
+            if content.startswith('|'):
+                return content
+        return None
+
+    def _caption(self, match):
+        label_type, text = match.group(1), match.group(2)
+        return ir.Caption("figure" if "Figura" in label_type else "table",
+                          text, label_type.replace(' ', '_').lower())
+
+
+def _indent(line):
+    # Tabs count as four columns, as in CommonMark list continuation
+    line = line.expandtabs(4) if '\t' in line else line
+    return len(line) - len(line.lstrip())
+
+
+def split_lines(text):
+    lines = text.split('\n')
+    if lines and lines[-1] == '':
+        lines.pop()
+    return lines
+
+
+def read_lines(f):
+    """Lazily yields the lines of a text file without their line endings."""
+    for line in f:
+        yield line[:-1] if line.endswith('\n') else line
+
+
+def parse(lines, profile):
+    """Yields the top-level IR nodes of an iterable of Markdown lines."""
+    parser = Parser(profile)
+    nodes = parser.nodes
+    for line in lines:
+        parser.feed(line)
+        if nodes:
+            yield from nodes
+            del nodes[:]
+    yield from parser.finish()
+
+
+def split_blocks(lines, profile):
+    """Yields (lines, nodes) for runs of lines that parse independently.
+
+    A block ends on a blank line after which the parser holds no open
+    list, quote, table, code block or pending caption. The parser is then
+    in the same state as a fresh one, so parsing and rendering the blocks
+    separately gives the same output as one pass over the document.
+
+    A long table (see Parser.start_long_table) is cut into a block per
+    chunk of rows. Such blocks start mid-table, so their lines are
+    preceded by the table's header row, which their rendering depends on.
+    """
+    parser = Parser(profile)
+    block = []
+    header = []
+    for line in lines:
+        block.append(line)
+        parser.feed(line)
+        if not line.strip() and parser.idle:
+            yield header + block, parser.nodes
+            block = []
+            header = []
+            parser.nodes = []
+        elif parser.long_header is not None and parser.nodes and not parser.table:
+            yield header + block, parser.nodes
+            block = []
+            header = [parser.long_header]
+            parser.nodes = []
+    if block:
+        yield header + block, parser.finish()
+
+
+def split_sections(lines, profile, level=2):
+    """Yields lists of lines, cut before each heading of at most level '#'.
+
+    Outside a code block a heading closes every open list, quote, table
+    and pending caption, in the order Parser.finish() does, so converting
+    the sections one by one gives the same output as one pass over the
+    document. Only code fences need tracking to find the cuts.
+    """
+    profile = get_profile(profile)
+    heading_re = compile_rules(profile).heading_re
+    section = []
+    code = False
+    for line in lines:
+        if code:
+            code = not line.startswith('```')
+        elif profile.code_blocks and line.startswith('```'):
+            code = True
+        elif line.startswith('#') and section:
+            match = heading_re.match(line.rstrip())
+            if match and len(match.group(1)) <= level:
+                yield section
+                section = []
+        section.append(line)
+    if section:
+        yield section
+
+
+def convert_section(lines, profile, backend='latex'):
+    """Output lines of one section (see split_sections)."""
+    return list(render(parse(lines, profile), profile, backend))
+
+
+def iter_convert_sections(lines, profile, pool, backend='latex', level=2,
+                          batch_lines=SECTION_BATCH_LINES, in_flight=SECTIONS_IN_FLIGHT):
+    """Like iter_convert, with the sections converted on an executor.
+
+    Consecutive sections are batched up to batch_lines lines, so that each
+    task is worth shipping to another process. Batches are submitted as
+    they are read, at most in_flight at a time, and their output is
+    yielded in document order: the result is that of a sequential
+    conversion.
+    """
+    profile = get_profile(profile)
+    # Registered profiles travel to worker processes by name
+    portable = profile.name if PROFILES.get(profile.name) is profile else profile
+    pending = deque()
+    batch = []
+    for section in split_sections(lines, profile, level):
+        batch.extend(section)
+        if len(batch) >= batch_lines:
+            pending.append(pool.submit(convert_section, batch, portable, backend))
+            batch = []
+            if len(pending) >= in_flight:
+                yield from pending.popleft().result()
+    if batch:
+        pending.append(pool.submit(convert_section, batch, portable, backend))
+    while pending:
+        yield from pending.popleft().result()
+
+
+def block_digest(block):
+    """SHA-256 of a block's source lines."""
+    return hashlib.sha256('\n'.join(block).encode('utf-8')).digest()
+
+
+def key_base(profile, backend='latex', fields=None):
+    """The part of block_key that does not depend on the block.
+
+    With fields, the render fields a block's output depends on (see
+    backends.render_fields), only those go into it besides the fields
+    that parsing depends on; otherwise the whole profile does.
+    """
+    if fields is None:
+        described = profile_digest(profile)
+    else:
+        described = render_digest(profile, fields)
+    return (engine_version() + described + backend).encode('ascii')
+
+
+def block_key(profile, digest, backend='latex', fields=None):
+    """Cache key of a block: engine, profile, backend and the block's digest."""
+    return hashlib.sha256(key_base(profile, backend, fields) + digest).hexdigest()
+
+
+def document_key(profile, data, backend='latex'):
+    """Cache key of a whole document's output, from its source bytes."""
+    return block_key(get_profile(profile), hashlib.sha256(b'document\0' + data).digest(),
+                     backend)
+
+
+@lru_cache(maxsize=None)
+def get_backend(profile, backend='latex'):
+    """The renderer for a profile and output format ('latex', 'text' or 'json')."""
+    try:
+        cls = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown output format: {backend}") from None
+    return cls(compile_rules(profile), profile)
+
+
+def render(nodes, profile, backend='latex'):
+    """Yields the output lines of IR nodes in the given format."""
+    renderer = get_backend(get_profile(profile), backend)
+    out = []
+    for node in nodes:
+        renderer.render(node, out)
+        yield from out
+        del out[:]
+
+
+def render_lines(lines, profile, backend='latex'):
+    return list(render(parse(lines, profile), profile, backend))
+
+
+def render_blocks(blocks, profile, cache=None, backend='latex'):
+    """Yields the output lines of (block digest, nodes) pairs.
+
+    With a BlockCache, each block's output is looked up by block_key, with
+    only the render fields its nodes depend on, and only blocks that
+    changed since they were last seen are rendered: after a render-only
+    profile edit, those whose nodes do not read the edited fields are
+    reused.
+    """
+    profile = get_profile(profile)
+    if cache is None:
+        for digest, nodes in blocks:
+            yield from render(nodes, profile, backend)
+        return
+    bases = {}  # render fields -> key_base of the blocks that depend on them
+    try:
+        for digest, nodes in blocks:
+            fields = render_fields(nodes)
+            base = bases.get(fields)
+            if base is None:
+                base = bases[fields] = key_base(profile, backend, fields)
+            key = hashlib.sha256(base + digest).hexdigest()
+            rendered = cache.get(key)
+            if rendered is None:
+                rendered = list(render(nodes, profile, backend))
+                cache.put(key, rendered)
+            yield from rendered
+    finally:
+        cache.flush()
+
+
+def iter_convert(lines, profile, cache=None, backend='latex'):
+    """Converts an iterable of Markdown lines, yielding output lines.
+
+    Output is handed on as soon as a top-level node is complete, so only
+    the current table or block is ever held in memory, whatever the input
+    size.
+    """
+    profile = get_profile(profile)
+    if cache is None:
+        return render(parse(lines, profile), profile, backend)
+    blocks = ((block_digest(block), nodes) for block, nodes in split_blocks(lines, profile))
+    return render_blocks(blocks, profile, cache, backend)
+
+
+def convert(text, profile, cache=None, backend='latex'):
+    """Converts a Markdown string to LaTeX (or another backend's format)."""
+    return '\n'.join(iter_convert(split_lines(text), profile, cache, backend))
+
+
+def write_lines(lines, f):
+    """Writes LaTeX lines to f, each terminated by a newline."""
+    for line in lines:
+        f.write(line)
+        f.write('\n')
+
+
+def convert_file(input_path, output_path, profile, cache=None, backend='latex',
+                 parsed=None, pool=None, labels=None):
+    """Converts a Markdown file to a LaTeX (or text, JSON) file.
+
+    The input is read and the output written line by line through a
+    temporary file next to the output. An output that already holds the
+    same LaTeX is not replaced, so its mtime (and LaTeX's caching
+    downstream) only moves on real changes. Returns whether the file was
+    written. With a BlockCache as cache, a document of up to
+    DOCUMENT_CACHE_BYTES whose source is unchanged is one cache lookup.
+    With a ParseCache (mdtex.parsecache) as parsed, the document is only
+    parsed when its source changed. With an executor as pool, and neither
+    cache, its sections are converted in parallel. The LaTeX goes through
+    labels (a labels.DocumentLabels), if given, on its way out.
+    """
+    emit = write_lines if labels is None else (
+        lambda lines, f: write_lines(labels.rewrite(lines), f))
+    key = None
+    if cache is not None and os.path.getsize(input_path) <= DOCUMENT_CACHE_BYTES:
+        with open(input_path, 'rb') as src:
+            key = document_key(profile, src.read(), backend)
+    tmp = output_path + '.tmp'
+    try:
+        with open(tmp, 'w', encoding='utf-8') as dst:
+            lines = cache.get(key) if key else None
+            if lines is not None:
+                emit(lines, dst)
+            elif parsed is not None:
+                blocks = parsed.blocks(input_path, profile)
+                lines = render_blocks(blocks, profile, cache, backend)
+                if key:
+                    lines = list(lines)
+                    cache.put(key, lines)
+                emit(lines, dst)
+            elif pool is not None and cache is None:
+                with open(input_path, 'r', encoding='utf-8') as src:
+                    emit(iter_convert_sections(read_lines(src), profile, pool, backend), dst)
+            else:
+                with open(input_path, 'r', encoding='utf-8') as src:
+                    lines = iter_convert(read_lines(src), profile, cache, backend)
+                    if key:
+                        lines = list(lines)
+                        cache.put(key, lines)
+                    emit(lines, dst)
+        if os.path.exists(output_path) and filecmp.cmp(tmp, output_path, shallow=False):
+            os.remove(tmp)
+            return False
+        os.replace(tmp, output_path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return True
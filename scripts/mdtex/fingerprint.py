@@ -0,0 +1,100 @@
+"""Stable hashes of inputs, profiles and the converter itself."""
+
+import hashlib
+import os
+from dataclasses import fields, is_dataclass
+from functools import lru_cache
+
+from .profiles import RENDER_FIELDS, get_profile
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def digest_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def digest_file(path):
+    """Returns the file's hash, or None when it does not exist."""
+    try:
+        with open(path, 'rb') as f:
+            return digest_bytes(f.read())
+    except FileNotFoundError:
+        return None
+
+
+def _sources_digest(names):
+    h = hashlib.sha256()
+    for name in sorted(names):
+        h.update(name.encode('utf-8'))
+        with open(os.path.join(PACKAGE_DIR, name), 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def engine_version():
+    """Hash of the converter sources.
+
+    profiles.py is left out: each job records the hash of its own profile,
+    so editing one profile only rebuilds the documents that use it.
+    """
+    return _sources_digest(name for name in os.listdir(PACKAGE_DIR)
+                           if name.endswith('.py') and name != 'profiles.py')
+
+
+@lru_cache(maxsize=None)
+def parser_version():
+    """Hash of the sources that decide how Markdown is parsed into the IR."""
+    return _sources_digest(['engine.py', 'ir.py'])
+
+
+def _describe(value):
+    # A stable, process-independent description of a profile value.
+    # Functions are identified by name plus the values they close over.
+    if is_dataclass(value):
+        return (type(value).__name__,) + tuple(
+            (f.name, _describe(getattr(value, f.name))) for f in fields(value))
+    if isinstance(value, (tuple, list)):
+        return tuple(_describe(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((repr(k), _describe(v)) for k, v in value.items()))
+    if callable(value) and hasattr(value, '__code__'):
+        cells = value.__closure__ or ()
+        return (value.__module__, value.__qualname__,
+                tuple(_describe(c.cell_contents) for c in cells))
+    return repr(value)
+
+
+@lru_cache(maxsize=None)
+def _profile_digest(profile):
+    return digest_bytes(repr(_describe(profile)).encode('utf-8'))
+
+
+def profile_digest(profile):
+    return _profile_digest(get_profile(profile))
+
+
+@lru_cache(maxsize=None)
+def _parse_digest(profile):
+    described = tuple(
+        (f.name, _describe(getattr(profile, f.name)))
+        for f in fields(profile) if f.name not in RENDER_FIELDS)
+    described += (('table', profile.table is not None), parser_version())
+    return digest_bytes(repr(described).encode('utf-8'))
+
+
+def parse_digest(profile):
+    """Hash of the parser sources and of the profile fields that affect parsing."""
+    return _parse_digest(get_profile(profile))
+
+
+@lru_cache(maxsize=None)
+def _render_digest(profile, names):
+    described = tuple((name, _describe(getattr(profile, name))) for name in sorted(names))
+    return digest_bytes(repr((_parse_digest(profile), described)).encode('utf-8'))
+
+
+def render_digest(profile, names):
+    """Hash of what parsing depends on and of the named render fields of a profile."""
+    return _render_digest(get_profile(profile), frozenset(names))
@@ -0,0 +1,321 @@
+"""Opt-in timing and counters for the conversion stages.
+
+    with instrument.record(memory=True) as rec:
+        convert_file('CAPITULO-4.md', 'CAPITULO-4.tex', 'cap4')
+    rec.write_json('trace.json')
+    rec.write_collapsed('trace.folded')   # flamegraph.pl / speedscope input
+
+record() swaps instrumented wrappers into the engine, latex, backends and
+cache modules and puts the originals back on exit, so the converter
+itself carries no hooks and runs at full speed when nothing is recording.
+"""
+
+import functools
+import json
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from . import backends, cache, engine, latex, parsecache, tables
+
+
+class _Stage:
+    __slots__ = ('calls', 'seconds', 'self_seconds', 'chars_in', 'chars_out')
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.self_seconds = 0.0
+        self.chars_in = 0
+        self.chars_out = 0
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class _CountingPattern:
+    """Stands in for a compiled regex and counts calls to its methods."""
+
+    def __init__(self, pattern, counters, name):
+        self._pattern = pattern
+        self._counters = counters
+        self._name = name
+
+    def __getattr__(self, attr):
+        method = getattr(self._pattern, attr)
+        if not callable(method):
+            return method
+        key = f'regex.{self._name}.{attr}'
+        counters = self._counters
+
+        def counted(*args, **kwargs):
+            counters[key] += 1
+            return method(*args, **kwargs)
+        return counted
+
+
+class Recorder:
+    """Wall time, call counts and characters in/out per stage.
+
+    Stages nest: the time of a stage entered while another one runs is
+    that stage's own and is subtracted from the outer stage's self time.
+    Stacks of stage names with their self time make the collapsed-stack
+    output.
+    """
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.stages = defaultdict(_Stage)
+        self.stacks = defaultdict(float)
+        self.counters = Counter()
+        self.documents = []
+        self._stack = []  # [name, start, time spent in child stages]
+        self._patches = []
+
+    def push(self, name):
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def pop(self, chars_in=0, chars_out=0):
+        name, start, children = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        stage = self.stages[name]
+        stage.calls += 1
+        stage.seconds += elapsed
+        stage.self_seconds += elapsed - children
+        stage.chars_in += chars_in
+        stage.chars_out += chars_out
+        self.stacks[';'.join([frame[0] for frame in self._stack] + [name])] += elapsed - children
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    # Installation
+
+    def _patch(self, owner, attr, replacement):
+        self._patches.append((owner, attr, getattr(owner, attr)))
+        setattr(owner, attr, replacement)
+
+    def install(self):
+        self._patch(engine, 'convert_file', self._convert_file(engine.convert_file))
+        self._patch(engine, 'convert', self._timed('convert', engine.convert, _text_in, _text_out))
+        self._patch(engine, 'read_lines', self._timed_iter('read', engine.read_lines, _line_out))
+        self._patch(parsecache.ParseCache, 'blocks',
+                    self._timed_iter('parse_cache', parsecache.ParseCache.blocks))
+        for method in ('get', 'put', 'flush'):
+            self._patch(cache.BlockCache, method,
+                        self._timed('block_cache', getattr(cache.BlockCache, method)))
+        self._patch(engine, 'write_lines', self._write_lines)
+        self._patch(engine.Parser, 'feed', self._timed('parse', engine.Parser.feed, _line_in))
+        self._patch(engine.Parser, 'finish', self._timed('parse', engine.Parser.finish))
+        self._patch(engine.Parser, 'close_list', self._timed('close_list', engine.Parser.close_list))
+        self._patch(engine, 'CAPTION_RE', _CountingPattern(engine.CAPTION_RE, self.counters, 'caption'))
+        self._patch(engine, 'compile_rules', self._compile_rules(engine.compile_rules))
+        for cls in backends.BACKENDS.values():
+            self._patch(cls, 'render', self._render(cls.render))
+        self._patch(backends, 'render_table',
+                    self._timed('table', backends.render_table, _rows_in, _text_out))
+        self._patch(backends, 'render_long_table_rows',
+                    self._timed('table', backends.render_long_table_rows, _long_rows_in,
+                                _text_out))
+        # Each module calls the escape_latex it imported; Rules.heading_fmt
+        # takes engine's when compile_rules builds it
+        for module in (latex, engine, backends, tables):
+            self._patch(module, 'escape_latex',
+                        self._timed('escape', module.escape_latex, _text_in, _text_out))
+        self._patch(latex, 'format_inline',
+                    self._timed('inline', latex.format_inline, _text_in, _text_out))
+        self._patch(latex, 'format_inline_batch',
+                    self._timed('inline_batch', latex.format_inline_batch, _texts_in, _texts_out))
+        for name in ('_ESCAPE_RE', 'INLINE_TOKEN_RE', 'EMPHASIS_TOKEN_RE'):
+            self._patch(latex, name, _CountingPattern(getattr(latex, name), self.counters,
+                                                      name.lower().strip('_')[:-3]))
+        # Rules and backends built before recording hold unwrapped patterns
+        engine.get_backend.cache_clear()
+
+    def uninstall(self):
+        while self._patches:
+            owner, attr, original = self._patches.pop()
+            setattr(owner, attr, original)
+        engine.get_backend.cache_clear()
+
+    # Wrappers
+
+    def _timed(self, name, fn, measure_in=None, measure_out=None):
+        rec = self
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            rec.push(name)
+            result = None
+            try:
+                result = fn(*args, **kwargs)
+                return result
+            finally:
+                rec.pop(measure_in(args) if measure_in else 0,
+                        measure_out(result) if measure_out and result is not None else 0)
+        return wrapper
+
+    def _convert_file(self, fn):
+        rec = self
+
+        @functools.wraps(fn)
+        def convert_file(input_path, output_path, profile, *args, **kwargs):
+            if rec.memory:
+                tracemalloc.reset_peak()
+            start = time.perf_counter()
+            written = rec._timed('convert_file', fn)(input_path, output_path, profile,
+                                                     *args, **kwargs)
+            document = {'input': input_path, 'output': output_path,
+                        'profile': getattr(profile, 'name', profile),
+                        'seconds': time.perf_counter() - start, 'written': written}
+            if rec.memory:
+                document['tracemalloc_peak'] = tracemalloc.get_traced_memory()[1]
+            rec.documents.append(document)
+            return written
+        return convert_file
+
+    def _timed_iter(self, name, fn, measure_out=None):
+        # Times each step of a generator; what the consumer does between
+        # steps is not part of the stage
+        rec = self
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            items = fn(*args, **kwargs)
+            while True:
+                rec.push(name)
+                try:
+                    item = next(items)
+                except StopIteration:
+                    rec.pop()
+                    return
+                except BaseException:
+                    rec.pop()
+                    raise
+                rec.pop(0, measure_out(item) if measure_out else 0)
+                yield item
+        return wrapper
+
+    def _write_lines(self, lines, f):
+        # Pulls the pipeline outside the 'write' stage, so that only the
+        # writes themselves are timed here
+        for line in lines:
+            self.push('write')
+            f.write(line)
+            f.write('\n')
+            self.pop(0, len(line) + 1)
+
+    def _render(self, fn):
+        rec = self
+
+        @functools.wraps(fn)
+        def render(backend, node, out=None):
+            out = [] if out is None else out
+            before = len(out)
+            rec.count(f'nodes.{type(node).__name__}')
+            if getattr(node, 'placeholder', False):
+                rec.count('placeholders')
+            rec.push('render')
+            try:
+                return fn(backend, node, out)
+            finally:
+                rec.pop(0, sum(len(line) + 1 for line in out[before:]))
+        return render
+
+    def _compile_rules(self, fn):
+        rec = self
+
+        @functools.wraps(fn)
+        def compile_rules(profile):
+            rules = engine.Rules(profile)
+            for name in ('heading_re', 'unordered_re', 'ordered_re'):
+                pattern = getattr(rules, name)
+                if pattern is not None:
+                    setattr(rules, name, _CountingPattern(pattern, rec.counters, name[:-3]))
+            return rules
+        return functools.lru_cache(maxsize=None)(compile_rules)
+
+    # Reports
+
+    def report(self):
+        stages = {name: stage.to_dict() for name, stage in
+                  sorted(self.stages.items(), key=lambda item: -item[1].self_seconds)}
+        data = {
+            'stages': stages,
+            'counters': dict(sorted(self.counters.items())),
+            'documents': self.documents,
+        }
+        if self.memory:
+            data['tracemalloc_peak'] = max(
+                (d.get('tracemalloc_peak', 0) for d in self.documents), default=0)
+        return data
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
+            f.write('\n')
+
+    def collapsed(self):
+        """Lines of 'outer;inner microseconds', as flamegraph.pl reads them."""
+        return [f'{stack} {round(seconds * 1e6)}'
+                for stack, seconds in sorted(self.stacks.items()) if seconds > 0]
+
+    def write_collapsed(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for line in self.collapsed():
+                f.write(line + '\n')
+
+
+def _text_in(args):
+    return len(args[0])
+
+
+def _text_out(result):
+    return len(result)
+
+
+def _line_out(line):
+    return len(line) + 1
+
+
+def _line_in(args):
+    return len(args[1]) + 1  # Parser.feed(self, line)
+
+
+def _rows_in(args):
+    return sum(len(row) + 1 for row in args[0])
+
+
+def _long_rows_in(args):
+    return sum(len(row) + 1 for row in args[1])  # (header, rows, ...)
+
+
+def _texts_in(args):
+    return sum(len(text) for text in args[0])
+
+
+def _texts_out(result):
+    return sum(len(text) for text in result)
+
+
+@contextmanager
+def record(memory=False):
+    """Instruments the converter for the duration of the block.
+
+    With memory=True, tracemalloc runs as well and every document reports
+    its peak traced allocation.
+    """
+    recorder = Recorder(memory)
+    started = memory and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    recorder.install()
+    try:
+        yield recorder
+    finally:
+        recorder.uninstall()
+        if started:
+            tracemalloc.stop()
@@ -0,0 +1,59 @@
+"""Multi-keyword substring search (Aho-Corasick).
+
+    matcher = KeywordMatcher(['modo ia', 'id', 'métrica'])
+    matcher.find('id | tarea | modo ia')   # {0, 1}
+
+One pass over the text finds every keyword it contains, however many
+keywords there are.
+"""
+
+from collections import deque
+
+
+class KeywordMatcher:
+    """Finds which of a fixed set of keywords occur in a text."""
+
+    def __init__(self, keywords):
+        self.keywords = list(keywords)
+        self._goto = [{}]  # state -> {char: state}
+        self._fail = [0]
+        self._out = [()]  # state -> indexes of the keywords ending there
+        for index, keyword in enumerate(self.keywords):
+            state = 0
+            for char in keyword:
+                following = self._goto[state].get(char)
+                if following is None:
+                    following = len(self._goto)
+                    self._goto[state][char] = following
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = following
+            self._out[state] += (index,)
+
+        # Failure links, breadth first: the longest proper suffix of a
+        # state's path that is also a path from the root
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, following in self._goto[state].items():
+                queue.append(following)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[following] = target if target != following else 0
+                self._out[following] += self._out[self._fail[following]]
+
+    def find(self, text):
+        """Indexes of the keywords found in text, as a set."""
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
@@ -0,0 +1,181 @@
+"""Labels and captions of the whole report, made unique across documents.
+
+index_labels() walks the parsed documents in manifest order and records every
+\\label the LaTeX backend will write, without rendering them. The first
+use of a label keeps it; later ones, in the same document or another,
+become label-2, label-3, ... Captions numbered in the Markdown
+('**[Tabla 4.1: ...]**') are also indexed by that name, so that prose
+mentioning 'Tabla 4.1' refers to the caption with \\ref.
+
+Each document's DocumentLabels rewrites its output lines as they are
+written, after the block cache, so cached blocks stay independent of the
+other documents.
+"""
+
+import hashlib
+import os
+import re
+
+from . import ir
+from .engine import compile_rules, parse, read_lines
+from .latex import escape_latex
+from .profiles import get_profile
+from .tables import table_label
+
+LABEL_RE = re.compile(r'\\label\{([^}]*)\}')
+# 'Tabla 3', 'Figura 4.2' in the text
+MENTION_RE = re.compile(r'\b(Tabla|Figura)\s+(\d+(?:\.\d+)*)\b')
+# The label engine.Parser mints for a numbered caption: 'tabla\_4.1'
+_CAPTION_LABEL_RE = re.compile(r'(tabla|figura)\\?_(\d+(?:\.\d+)*)')
+
+
+def clean_label(label):
+    """A label without the LaTeX escapes of its Markdown source."""
+    return label.replace('\\', '').replace(' ', '_')
+
+
+def _mention(label):
+    match = _CAPTION_LABEL_RE.fullmatch(label)
+    return f'{match.group(1).capitalize()} {match.group(2)}' if match else None
+
+
+def document_labels(nodes, profile):
+    """The labels of a document's nodes, in output order."""
+    profile = get_profile(profile)
+    fmt_batch = compile_rules(profile).fmt_batch
+    labels = []
+    stack = list(reversed(nodes))
+    while stack:
+        node = stack.pop()
+        if type(node) is ir.Caption:
+            labels.append(escape_latex(node.label))  # as LatexBackend writes it
+        elif type(node) in (ir.Table, ir.TableHead):
+            label = table_label(node.rows, profile.table, fmt_batch, node.caption)
+            if label:
+                labels.append(label)
+        elif type(node) in (ir.List, ir.Quote):
+            stack.extend(reversed(node.children))
+    return labels
+
+
+class DocumentLabels:
+    """Label renames and caption references for one document's LaTeX."""
+
+    def __init__(self, renames=None, targets=None):
+        self.renames = renames or {}  # written label -> unique label of each use
+        self.targets = targets or {}  # 'Tabla 4.1' -> label
+
+    def digest(self):
+        data = repr((sorted(self.renames.items()), sorted(self.targets.items())))
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    def rewrite(self, lines):
+        """Yields the lines with unique labels and referenced mentions.
+
+        minted code blocks are left as they are.
+        """
+        uses = {label: iter(unique) for label, unique in self.renames.items()}
+
+        def rename(match):
+            label = match.group(1)
+            unique = next(uses[label], None) if label in uses else None
+            return r'\label{' + unique + '}' if unique else match.group()
+
+        def refer(match):
+            label = self.targets.get(match.group(1) + ' ' + match.group(2))
+            return match.group(1) + r'~\ref{' + label + '}' if label else match.group()
+
+        code = False
+        for line in lines:
+            if code:
+                code = not line.startswith(r'\end{minted}')
+            elif line.startswith(r'\begin{minted}'):
+                code = True
+            else:
+                if r'\label{' in line:
+                    line = LABEL_RE.sub(rename, line)
+                if self.targets and ('Tabla' in line or 'Figura' in line) \
+                        and not line.startswith(r'\caption{'):
+                    line = MENTION_RE.sub(refer, line)
+            yield line
+
+
+class LabelRegistry:
+    """Every label of the report, keyed by document name."""
+
+    def __init__(self):
+        self.documents = {}  # name -> [written label, ...]
+        self.unique = {}  # name -> [unique label, ...]
+        self.targets = {}  # 'Tabla 4.1' -> label, first caption of that name
+        self.duplicates = []  # (name, written label, unique label)
+        self._taken = set()
+
+    def add(self, name, labels):
+        """Registers a document's labels; call in report order."""
+        self.documents[name] = labels
+        unique = []
+        for label in labels:
+            base = candidate = clean_label(label)
+            n = 1
+            while candidate in self._taken:
+                n += 1
+                candidate = f'{base}-{n}'
+            self._taken.add(candidate)
+            unique.append(candidate)
+            if n > 1:
+                self.duplicates.append((name, label, candidate))
+            mention = _mention(label)
+            if mention:
+                self.targets.setdefault(mention, candidate)
+        self.unique[name] = unique
+
+    def document(self, name):
+        """The DocumentLabels of a registered document.
+
+        Mentions of a caption the document has itself refer to that one.
+        """
+        renames = {}
+        own = {}
+        for label, unique in zip(self.documents.get(name, ()), self.unique.get(name, ())):
+            renames.setdefault(label, []).append(unique)
+            mention = _mention(label)
+            if mention:
+                own.setdefault(mention, unique)
+        return DocumentLabels(renames, dict(self.targets, **own))
+
+
+def _nodes(job, parsed):
+    if parsed is not None:
+        for _, nodes in parsed.blocks(job.input, job.profile):
+            yield from nodes
+        return
+    with open(job.input, 'r', encoding='utf-8') as f:
+        yield from parse(read_lines(f), job.profile)
+
+
+def index_labels(jobs, parsed=None, memo=None):
+    """LabelRegistry of the jobs' documents, keyed by input file name.
+
+    Documents are parsed (or read from a ParseCache) but not rendered;
+    missing inputs are left out. With a dict as memo, each document's
+    labels are kept in it by the hash of its source, and only documents
+    whose source changed since are parsed again.
+    """
+    registry = LabelRegistry()
+    for job in jobs:
+        try:
+            if memo is None:
+                labels = document_labels(list(_nodes(job, parsed)), job.profile)
+            else:
+                with open(job.input, 'rb') as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()
+                known = memo.get(job.input)
+                if known and known[:2] == (digest, job.profile):
+                    labels = known[2]
+                else:
+                    labels = document_labels(list(_nodes(job, parsed)), job.profile)
+                    memo[job.input] = (digest, job.profile, labels)
+        except FileNotFoundError:
+            continue
+        registry.add(os.path.basename(job.input), labels)
+    return registry
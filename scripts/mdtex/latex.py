@@ -0,0 +1,151 @@
+import re
+
+from .symbols import make_transliterator
+
+# Special LaTeX characters in text mode. All keys are single characters, so a
+# character class escapes a string in one pass and never re-escapes the
+# braces introduced by \textbackslash{}.
+LATEX_ESCAPES = {
+    '\\': r'\textbackslash{}',
+    '&': r'\&',
+    '%': r'\%',
+    '$': r'\$',
+    '#': r'\#',
+    '_': r'\_',
+    '{': r'\{',
+    '}': r'\}',
+    '~': r'\textasciitilde{}',
+    '^': r'\textasciicircum{}',
+}
+
+_ESCAPE_RE = re.compile('[' + re.escape(''.join(LATEX_ESCAPES)) + ']')
+
+
+def _escape_match(match):
+    return LATEX_ESCAPES[match.group()]
+
+
+# One scan finds every inline token: a code span, a run of '*' delimiters or
+# a line break. Line breaks are hard boundaries so that a batch of strings can
+# be formatted as one newline-joined text without emphasis leaking between them.
+INLINE_TOKEN_RE = re.compile(r'`([^`\n]*)`|(\*+)|\n')
+EMPHASIS_TOKEN_RE = re.compile(r'()(\*+)|\n')
+
+_EMPHASIS = {1: r'\textit{', 2: r'\textbf{'}
+
+
+def escape_latex(text):
+    """Escapes special LaTeX characters in text mode."""
+    return _ESCAPE_RE.sub(_escape_match, text)
+
+
+def _close_opener(out, opener):
+    # Stars the opener never matched stay literal, outside the commands it
+    # opened; those were opened innermost first.
+    index, remaining, opened = opener
+    out[index] = '*' * remaining + ''.join(reversed(opened))
+
+
+def _tokenize(text, code_spans):
+    """Renders code spans and nested emphasis in one left-to-right scan.
+
+    A run of '*' can close emphasis when it follows a non-space character
+    and open it when it precedes one. Closing runs are matched against a
+    stack of open runs, two stars at a time for bold and one for italic, so
+    every delimiter is handled once.
+    """
+    if '*' not in text and (not code_spans or '`' not in text):
+        return text
+
+    out = []
+    stack = []  # [output index, unmatched stars, commands opened]
+    pos = 0
+    end = len(text)
+    token_re = INLINE_TOKEN_RE if code_spans else EMPHASIS_TOKEN_RE
+    for match in token_re.finditer(text):
+        start = match.start()
+        if start > pos:
+            out.append(text[pos:start])
+        pos = match.end()
+
+        stars = match.group(2)
+        if stars is None:
+            code = match.group(1)
+            if code is not None:
+                out.append(r'\texttt{' + code + '}')
+                continue
+            for opener in stack:
+                _close_opener(out, opener)
+            stack = []
+            out.append('\n')
+            continue
+
+        count = len(stars)
+        if start and not text[start - 1].isspace():
+            while count and stack:
+                opener = stack[-1]
+                size = 2 if count >= 2 and opener[1] >= 2 else 1
+                opener[1] -= size
+                opener[2].append(_EMPHASIS[size])
+                out.append('}')
+                count -= size
+                if not opener[1]:
+                    stack.pop()
+                    _close_opener(out, opener)
+        if count:
+            if pos < end and not text[pos].isspace():
+                stack.append([len(out), count, []])
+                out.append(None)
+            else:
+                out.append('*' * count)
+
+    if pos < end:
+        out.append(text[pos:])
+    for opener in stack:
+        _close_opener(out, opener)
+    return ''.join(out)
+
+
+def format_inline(text, escape=True, code_spans=True):
+    """Formats code, bold and italic spans, escaping the text if asked.
+
+    None of the delimiters is a LaTeX special character, so the whole
+    string is escaped once up front and the scan works on escaped text.
+    """
+    if escape:
+        text = escape_latex(text)
+    return _tokenize(text, code_spans)
+
+
+def format_inline_batch(texts, escape=True, code_spans=True):
+    """Formats many single-line strings, e.g. all cells of a table, at once."""
+    texts = list(texts)
+    if any('\n' in text for text in texts):
+        return [format_inline(text, escape, code_spans) for text in texts]
+    return format_inline('\n'.join(texts), escape, code_spans).split('\n')
+
+
+def make_formatter(escape=True, code_spans=True, checkboxes=False, symbols=(),
+                   strict_symbols=False):
+    """Builds the (single, batch) inline formatters for a profile.
+
+    Without escaping, this is the behaviour of the chapter 9 and annex
+    converters, which passed their input through untouched. Checkboxes
+    and symbols are replaced in one scan (see mdtex.symbols).
+    """
+    post = make_transliterator(symbols, checkboxes, strict_symbols)
+
+    if post is None:
+        def fmt(text):
+            return format_inline(text, escape, code_spans)
+
+        def fmt_batch(texts):
+            return format_inline_batch(texts, escape, code_spans)
+    else:
+        def fmt(text):
+            return post(format_inline(text, escape, code_spans))
+
+        def fmt_batch(texts):
+            return [post(text) for text in format_inline_batch(texts, escape, code_spans)]
+
+    return fmt, fmt_batch
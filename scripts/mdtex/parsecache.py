@@ -0,0 +1,107 @@
+"""On-disk cache of parsed documents.
+
+Each Markdown file and parse digest (see fingerprint.parse_digest) gets
+one binary file: a fixed header with the source's mtime, size and SHA-256,
+followed by one length-prefixed marshal record per block, holding the
+block digest and its nodes as ir.to_tuple() tuples.
+Records are read back one at a time, so a cached document streams like a
+parsed one. A render-only profile change, such as another table style,
+keeps the parse digest and so skips parsing altogether; with a block cache
+too, only the blocks whose nodes read the changed fields are rendered
+again (see engine.render_blocks).
+"""
+
+import hashlib
+import marshal
+import os
+import struct
+
+from . import ir
+from .engine import block_digest, read_lines, split_blocks
+from .fingerprint import parse_digest
+
+MAGIC = b'MDIR\x00\x00\x00\x01'
+HEADER = struct.Struct('<8sqq32s')  # magic, mtime_ns, size, sha256
+RECORD = struct.Struct('<I')  # length of the marshal data that follows
+
+
+class ParseCache:
+    """Parsed blocks of Markdown files, stored under a directory."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, input_path, profile):
+        name = os.path.basename(input_path)
+        return os.path.join(self.directory, f'{name}.{parse_digest(profile)[:16]}.mdir')
+
+    def blocks(self, input_path, profile):
+        """Yields (block digest, nodes) for a Markdown file.
+
+        The cached parse is used when the source's mtime and size match,
+        or when its content hash does (e.g. after a checkout that only
+        touched it). Otherwise the file is parsed and the cache rewritten
+        as the blocks go by.
+        """
+        path = self.path(input_path, profile)
+        f = self._open(path, input_path)
+        if f is not None:
+            self.hits += 1
+            with f:
+                while True:
+                    prefix = f.read(RECORD.size)
+                    if not prefix:
+                        return
+                    digest, nodes = marshal.loads(f.read(RECORD.unpack(prefix)[0]))
+                    yield digest, [ir.from_tuple(node) for node in nodes]
+        self.misses += 1
+        yield from self._parse_and_store(path, input_path, profile)
+
+    def _open(self, path, input_path):
+        try:
+            f = open(path, 'r+b')
+        except OSError:
+            return None
+        try:
+            magic, mtime_ns, size, digest = HEADER.unpack(f.read(HEADER.size))
+            st = os.stat(input_path)
+            if magic == MAGIC and (mtime_ns, size) == (st.st_mtime_ns, st.st_size):
+                return f
+            if magic == MAGIC and size == st.st_size and digest == _file_digest(input_path):
+                f.seek(0)
+                f.write(HEADER.pack(MAGIC, st.st_mtime_ns, size, digest))
+                f.seek(HEADER.size)
+                return f
+        except (OSError, struct.error):
+            pass
+        f.close()
+        return None
+
+    def _parse_and_store(self, path, input_path, profile):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        st = os.stat(input_path)
+        header = HEADER.pack(MAGIC, st.st_mtime_ns, st.st_size, _file_digest(input_path))
+        try:
+            with open(input_path, 'r', encoding='utf-8') as src, open(tmp, 'wb') as out:
+                out.write(header)
+                for block, nodes in split_blocks(read_lines(src), profile):
+                    digest = block_digest(block)
+                    data = marshal.dumps((digest, tuple(ir.to_tuple(n) for n in nodes)))
+                    out.write(RECORD.pack(len(data)))
+                    out.write(data)
+                    yield digest, nodes
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
+def _file_digest(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            h.update(chunk)
+    return h.digest()
@@ -0,0 +1,161 @@
+from dataclasses import dataclass, replace
+
+from .columns import ColumnPlanner
+from .tables import TableStyle, load_rules
+
+# Heading commands by Markdown level. Chapters 1-5 accept any number of '#'
+# and map the deepest levels to \paragraph.
+SECTIONING = ('chapter', 'section', 'subsection', 'subsubsection', 'paragraph')
+
+ANY_HEADING = r'^(#+)\s+(.*)'
+
+# Symbols the documents use, mapped to fontawesome5/amssymb commands. An
+# emoji missing here fails the conversion (see mdtex.symbols; run
+# 'python -m mdtex.audit' to audit docs/).
+CHECK_SYMBOLS = (
+    ('✅', r'\checkmark'),
+    ('⚠️', r'!'),
+)
+
+EMOJI_SYMBOLS = CHECK_SYMBOLS + (
+    ('🔒', r'\faLock'),
+    ('🎓', r'\faGraduationCap'),
+    ('🧠', r'\faBrain'),
+    ('👶', r'\faChild'),
+    ('🍼', r'\faChild'),
+    ('⚖️', r'\faBalanceScale'),
+    ('💼', r'\faBriefcase'),
+    ('📚', r'\faBook'),
+    ('🎭', r'\faExclamationTriangle'),
+    ('🛠️', r'\faWrench'),
+    ('📝', r'\faEdit'),
+    ('🥊', r'\faGavel'),
+    ('🧮', r'\faCalculator'),
+    ('🗺️', r'\faMap'),
+    ('🔓', r'\faUnlock'),
+    ('♾️', r'$\infty$'),
+    ('🔵', r'\faCircle'),
+    ('🌳', r'\faTree'),
+)
+
+
+@dataclass(frozen=True)
+class Profile:
+    """Per-document conversion settings for the shared engine."""
+    name: str
+    # Inline formatting: escape LaTeX specials (chapters 1-8) or pass the
+    # text through and only rewrite emphasis (chapter 9 and annexes).
+    escape: bool = True
+    code_spans: bool = True
+    checkboxes: bool = False
+    symbols: tuple = ()
+    strict_symbols: bool = True  # emoji missing from symbols are an error
+    # Headings
+    heading_pattern: str = ANY_HEADING
+    heading_commands: tuple = SECTIONING
+    heading_text: str = 'escape'  # 'escape', 'inline' or 'plain'
+    # Blocks
+    code_blocks: bool = True
+    unordered_pattern: str = r'^\s*[\*\-]\s+(.*)'
+    ordered_pattern: str = r'^\s*\d+\.\s+(.*)'  # None disables numbered lists
+    loose_lists: bool = False  # blank lines keep a list open
+    blank_after_list: bool = True  # keep the blank line that closed a list
+    list_continuation: bool = False  # plain text lines stay inside a list
+    nested_lists: bool = True  # deeper-indented items open a nested list
+    paragraph_gap: bool = True  # blank line after every paragraph
+    strip_paragraphs: bool = False
+    quotes: str = 'line'  # None, 'line' (one quote per line) or 'block'
+    quotes_close_lists: bool = True
+    captions: str = None  # None, 'inline' or 'deferred'
+    quoted_tables: bool = False
+    # Tables with more body rows than this stream as a longtable/xltabular
+    # instead of a float (None: never)
+    long_table_rows: int = 200
+    table: TableStyle = TableStyle()
+
+
+# Fields only the backends read. Changing them leaves the parsed form of a
+# document valid (see mdtex.parsecache); of 'table' the parser only needs
+# to know whether tables are recognised at all. backends.RENDER_DEPENDENCIES
+# says which node types read which of them.
+RENDER_FIELDS = frozenset({
+    'name', 'escape', 'code_spans', 'checkboxes', 'symbols', 'strict_symbols',
+    'heading_commands', 'heading_text', 'paragraph_gap', 'table',
+})
+
+
+def _annex(name, **kwargs):
+    defaults = dict(
+        escape=False, code_spans=False, heading_pattern=r'^(#{1,4}) (.*)',
+        heading_commands=SECTIONING[:4], heading_text='plain',
+        code_blocks=False, paragraph_gap=False, strip_paragraphs=True,
+        quotes=None,
+    )
+    defaults.update(kwargs)
+    return Profile(name, **defaults)
+
+
+_chapter = Profile('chapter', symbols=EMOJI_SYMBOLS)
+
+_plain_chapter = replace(
+    _chapter, heading_pattern=r'^(#{1,4}) (.*)',
+    unordered_pattern=r'^\s*[\*\-] (.*)', ordered_pattern=r'^\s*\d+\.\s*(.*)',
+    heading_commands=SECTIONING[:4], heading_text='inline',
+    code_blocks=False, paragraph_gap=False, quotes=None, table=None,
+)
+
+# Captions, labels and column specs of the annexes' known tables, by
+# profile (see tables.load_rules)
+_RULES = load_rules()
+
+_TABULARX = dict(placement='h', environment='tabularx', small=False,
+                 trim_rows=True, column_spec=ColumnPlanner(stretch=True))
+
+PROFILES = {p.name: p for p in (
+    replace(_chapter, name='cap1'),
+    replace(_chapter, name='cap2'),
+    replace(_chapter, name='cap3'),
+    replace(_chapter, name='cap4', loose_lists=True, list_continuation=True,
+            paragraph_gap=False, captions='inline'),
+    replace(_chapter, name='cap5', loose_lists=True, list_continuation=True,
+            paragraph_gap=False, captions='deferred', quoted_tables=True),
+    replace(_plain_chapter, name='cap6'),
+    replace(_plain_chapter, name='cap7', table=TableStyle(
+        caption='Cumplimiento de Objetivos', label='tabla:objetivos')),
+    replace(_plain_chapter, name='cap8', table=TableStyle(
+        column_spec=ColumnPlanner(),
+        caption='Comparativa: LMS Tradicional vs Asistente IA',
+        label='tabla:lms_vs_ai')),
+    _annex('cap9', heading_pattern=r'^(#{1,3}) (.*)',
+           heading_commands=SECTIONING[:3], table=TableStyle(
+               **_TABULARX,
+               caption='Verificación de cumplimiento de objetivos',
+               label='tab:objetivos')),
+    _annex('anexo_a', checkboxes=True, table=TableStyle(
+        drop_empty_headers=True, **_TABULARX,
+        caption='Resumen de Épicas del Proyecto', label='tab:epicas')),
+    _annex('anexo_b', code_spans=True, ordered_pattern=None, table=TableStyle(
+        drop_empty_headers=True, **_TABULARX,
+        rules=_RULES['anexo_b'])),
+    _annex('anexo_c', code_spans=True, checkboxes=True, symbols=CHECK_SYMBOLS,
+           loose_lists=True, quotes='block', quotes_close_lists=False,
+           table=TableStyle(
+               drop_empty_headers=True, **_TABULARX,
+               caption='Tabla de Evaluación', label='tab:eval',
+               rules=_RULES['anexo_c'])),
+    _annex('anexo_d', code_spans=True, checkboxes=True, symbols=EMOJI_SYMBOLS,
+           blank_after_list=False, quotes='block', table=TableStyle(
+               drop_empty_headers=True, **_TABULARX,
+               caption='Tabla', label='tab:default',
+               rules=_RULES['anexo_d'])),
+)}
+
+
+def get_profile(profile):
+    """Accepts a Profile or the name of a registered one."""
+    if isinstance(profile, Profile):
+        return profile
+    try:
+        return PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"Unknown profile: {profile!r}") from None
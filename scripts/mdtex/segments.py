@@ -0,0 +1,433 @@
+"""Segmented BM25 index of the retrieval chunks, updated file by file.
+
+    python -m mdtex.segments update                # index what changed in docs/
+    python -m mdtex.segments query 'gestión de riesgos' -k 5
+    python -m mdtex.segments status
+    python -m mdtex.segments merge --all           # compact into one segment
+
+The index is a directory of immutable BM25 files (see mdtex.bm25), the
+segments, listed oldest first in segments.json with the source files each
+one holds. An update chunks and indexes only the Markdown files whose
+content changed since the last one, into one new segment, and records
+their sources as tombstones: the chunks of those sources in older segments
+are dead. A removed file leaves only a tombstone. An update so costs what
+the changed files cost, whatever the size of the rest of the corpus.
+
+A query reads the postings of its terms in every segment, leaving out
+the dead chunks, and keeps the best k. Document frequencies, the chunk
+count and the average length are those of the live chunks of all the
+segments, so the scores are the ones a full rebuild of the index gives.
+
+After an update a merge runs in a background thread when the segments are
+out of balance (plan_merge()): the youngest segments are rewritten as one,
+without their dead chunks, once together they hold RATIO times the live
+chunks of the segment before them. Segment sizes grow geometrically, so a
+chunk is rewritten about log(corpus) times. A merge swaps segments.json
+atomically; open SegmentedIndexes keep their snapshot until refresh().
+
+One process at a time writes to a segment directory.
+"""
+
+import argparse
+import hashlib
+import heapq
+import json
+import math
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+
+from .analyzer import ANALYZER
+from .bm25 import BM25Index, chunk_text, write_index
+from .build import REPO_ROOT
+from .chunks import DEFAULT_PATHS, MARKDOWN, chunk_file, manifest_profiles, markdown_files
+
+DEFAULT_DIRECTORY = os.path.join(REPO_ROOT, 'docs', 'retrieval', 'segments')
+CATALOG = 'segments.json'
+# Merge the youngest segments once they hold RATIO times the live chunks
+# of the segment before them
+RATIO = 1.0
+
+Update = namedtuple('Update', 'changed removed segment documents seconds')
+Merge = namedtuple('Merge', 'segments segment documents seconds')
+
+
+def _source(path):
+    return os.path.relpath(path, REPO_ROOT).replace(os.sep, '/')
+
+
+def _digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def load_catalog(directory):
+    """The segments.json of a directory; an empty one if there is none."""
+    try:
+        with open(os.path.join(directory, CATALOG), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'next': 1, 'sources': {}, 'segments': []}
+
+
+def save_catalog(directory, catalog):
+    path = os.path.join(directory, CATALOG)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(catalog, f, ensure_ascii=False, indent=1)
+        f.write('\n')
+    os.replace(tmp, path)
+
+
+def dead_sources(entries):
+    """Per catalog entry, the sources it holds that a later entry tombstones."""
+    dead = []
+    later = set()
+    for entry in reversed(entries):
+        dead.append({source for source, _, _ in entry['ranges'] if source in later})
+        later.update(entry['tombstones'])
+    dead.reverse()
+    return dead
+
+
+def live_documents(entries):
+    """Per catalog entry, how many of its chunks are live."""
+    return [entry['documents'] - sum(count for source, _, count in entry['ranges']
+                                     if source in dead)
+            for entry, dead in zip(entries, dead_sources(entries))]
+
+
+def plan_merge(entries, ratio=RATIO):
+    """Position of the oldest segment of the youngest ones to merge, or None.
+
+    That is the first segment whose younger segments hold together at
+    least ratio times its live chunks; segments without live chunks are
+    always merged with the younger ones.
+    """
+    live = live_documents(entries)
+    first = None
+    younger = 0
+    for i in range(len(entries) - 2, -1, -1):
+        younger += live[i + 1]
+        if younger >= ratio * live[i]:
+            first = i
+    return first
+
+
+class SegmentedIndex:
+    """A snapshot of a segment directory, queried as one BM25 index."""
+
+    def __init__(self, directory=DEFAULT_DIRECTORY):
+        self.directory = directory
+        self.segments = []  # (BM25Index, dead document numbers), oldest first
+        self._open = {}  # file name -> BM25Index
+        self.refresh()
+
+    def refresh(self):
+        """Reopens the directory's current segments; unchanged files stay open."""
+        catalog = load_catalog(self.directory)
+        while True:
+            try:
+                opened = self._snapshot(catalog['segments'])
+                break
+            except FileNotFoundError:
+                # A merge removed a segment after we read the catalog
+                current = load_catalog(self.directory)
+                if current == catalog:
+                    raise
+                catalog = current
+        for name, index in self._open.items():
+            if name not in opened:
+                index.close()
+        self._open = opened
+        # Collection statistics of the live chunks
+        self.documents = 0
+        length = 0.0
+        for index, dead in self.segments:
+            self.documents += index.documents - len(dead)
+            length += index.average * index.documents - sum(map(index.length, dead))
+        self.average = length / self.documents if self.documents else 0.0
+        self.analyzer = self.segments[0][0].analyzer if self.segments else ANALYZER
+
+    def _snapshot(self, entries):
+        opened = {}
+        segments = []
+        try:
+            for entry, dead in zip(entries, dead_sources(entries)):
+                name = entry['file']
+                index = self._open.get(name) or BM25Index(os.path.join(self.directory, name))
+                opened[name] = index
+                numbers = set()
+                for source, first, count in entry['ranges']:
+                    if source in dead:
+                        numbers.update(range(first, first + count))
+                segments.append((index, numbers))
+        except BaseException:
+            for name, index in opened.items():
+                if name not in self._open:
+                    index.close()
+            raise
+        self.segments = segments
+        return opened
+
+    def close(self):
+        for index in self._open.values():
+            index.close()
+        self._open = {}
+        self.segments = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def idf(self, df):
+        return math.log(1 + (self.documents - df + 0.5) / (df + 0.5))
+
+    def scores(self, terms):
+        """(score, segment position, document number) of the live chunks matching any term."""
+        terms = set(terms)
+        # Live postings first: the document frequencies count them only
+        found = []  # per segment, [(term, postings), ...]
+        df = dict.fromkeys(terms, 0)
+        for index, dead in self.segments:
+            postings = []
+            for term in terms:
+                pairs = list(index.postings(term))
+                if dead:
+                    pairs = [pair for pair in pairs if pair[0] not in dead]
+                if pairs:
+                    postings.append((term, pairs))
+                    df[term] += len(pairs)
+            found.append(postings)
+        results = []
+        for position, ((index, _), postings) in enumerate(zip(self.segments, found)):
+            if not postings:
+                continue
+            weighted = [(pairs, self.idf(df[term])) for term, pairs in postings]
+            scores = index.add_scores(weighted, index.norms(self.average), {})
+            results.extend((score, position, number) for number, score in scores.items())
+        return results
+
+    def search(self, terms, k=10):
+        """The k best (chunk id, score) pairs for query terms, best first."""
+        best = heapq.nlargest(k, self.scores(terms))
+        return [(self.segments[position][0].doc_id(number), score)
+                for score, position, number in best]
+
+    def search_text(self, text, k=10):
+        """search() for the terms the index's analyzer finds in text."""
+        return self.search(self.analyzer(text), k)
+
+
+class IndexWriter:
+    """Updates a segment directory; merges run in a background thread."""
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, ratio=RATIO, analyzer=ANALYZER):
+        self.directory = directory
+        self.ratio = ratio
+        self.analyzer = analyzer
+        self.merges = []  # Merges done, in order
+        self._catalog_lock = threading.Lock()
+        self._merge_lock = threading.Lock()  # one merge at a time
+        self._merger = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _reserve(self, catalog):
+        # A new segment file name; the caller saves the catalog
+        name = f"{catalog['next']:06d}.seg"
+        catalog['next'] += 1
+        return name
+
+    def update(self, paths=DEFAULT_PATHS, merge=True):
+        """Indexes the Markdown files under paths that changed; returns an Update.
+
+        Sources under paths that no longer exist are tombstoned. With
+        merge, a background merge follows if plan_merge() asks for one.
+        """
+        start = time.perf_counter()
+        profiles = manifest_profiles(paths)
+        files = {_source(path): path for path in markdown_files(paths)}
+        roots = [_source(path) for path in paths]
+        with self._catalog_lock:
+            catalog = load_catalog(self.directory)
+            known = catalog['sources']
+            digests = {source: _digest(path) for source, path in files.items()}
+            changed = [source for source in files if known.get(source) != digests[source]]
+            removed = [source for source in known if source not in files and any(
+                source == root or source.startswith(root + '/') for root in roots)]
+            if not changed and not removed:
+                return Update([], [], None, 0, time.perf_counter() - start)
+
+            documents = []
+            ranges = []
+            for source in changed:
+                path = files[source]
+                first = len(documents)
+                documents.extend(
+                    (chunk.id, self.analyzer(chunk_text(chunk)))
+                    for chunk in chunk_file(path, profiles.get(os.path.abspath(path), MARKDOWN)))
+                ranges.append([source, first, len(documents) - first])
+            name = self._reserve(catalog)
+            write_index(documents, os.path.join(self.directory, name), analyzer=self.analyzer)
+            catalog['segments'].append({
+                'file': name,
+                'documents': len(documents),
+                'ranges': ranges,
+                'tombstones': sorted(source for source in changed + removed if source in known),
+            })
+            for source in removed:
+                del known[source]
+            known.update((source, digests[source]) for source in changed)
+            save_catalog(self.directory, catalog)
+        if merge:
+            self.merge_in_background()
+        return Update(changed, removed, name, len(documents), time.perf_counter() - start)
+
+    def merge(self, everything=False):
+        """Merges the segments plan_merge() picks, or all of them; returns a Merge or None."""
+        with self._merge_lock:
+            start = time.perf_counter()
+            with self._catalog_lock:
+                catalog = load_catalog(self.directory)
+                entries = catalog['segments']
+                if everything:
+                    first = 0 if entries else None
+                else:
+                    first = plan_merge(entries, self.ratio)
+                if first is None:
+                    return None
+                merged = entries[first:]
+                dead = dead_sources(entries)[first:]
+                name = self._reserve(catalog)
+                save_catalog(self.directory, catalog)
+
+            # Updates may add segments meanwhile; they stay younger than this one
+            entry = self._rewrite(merged, dead, name, tombstones=first > 0)
+            with self._catalog_lock:
+                catalog = load_catalog(self.directory)
+                files = [e['file'] for e in catalog['segments']]
+                position = files.index(merged[0]['file'])
+                catalog['segments'][position:position + len(merged)] = [entry]
+                save_catalog(self.directory, catalog)
+            for e in merged:
+                os.remove(os.path.join(self.directory, e['file']))
+            result = Merge([e['file'] for e in merged], name, entry['documents'],
+                           time.perf_counter() - start)
+            self.merges.append(result)
+            return result
+
+    def _rewrite(self, entries, dead, name, tombstones):
+        # One segment of the live chunks of entries, in their order
+        documents = []
+        ranges = []
+        removed = set()
+        for entry, gone in zip(entries, dead):
+            removed.update(entry['tombstones'])
+            live = [r for r in entry['ranges'] if r[0] not in gone]
+            if not live:
+                continue
+            with BM25Index(os.path.join(self.directory, entry['file'])) as index:
+                counts = index.term_counts()
+                for source, first, count in live:
+                    ranges.append([source, len(documents), count])
+                    for number in range(first, first + count):
+                        terms = [term for term, tf in counts[number].items() for _ in range(tf)]
+                        documents.append((index.doc_id(number), terms))
+        write_index(documents, os.path.join(self.directory, name), analyzer=self.analyzer)
+        # Tombstones only matter to older segments
+        return {'file': name, 'documents': len(documents), 'ranges': ranges,
+                'tombstones': sorted(removed) if tombstones else []}
+
+    def _merge_all_planned(self):
+        # Updates made during a merge may call for another one
+        while self.merge() is not None:
+            pass
+
+    def merge_in_background(self):
+        """Starts a thread of merge()s until none is due, unless one is running.
+
+        Returns the thread, or None.
+        """
+        if self._merger is not None and self._merger.is_alive():
+            return None
+        self._merger = threading.Thread(target=self._merge_all_planned, name='mdtex-merge')
+        self._merger.start()
+        return self._merger
+
+    def wait(self):
+        """Waits for the background merge, if any."""
+        if self._merger is not None:
+            self._merger.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m mdtex.segments',
+                                     description='Update or query the segmented BM25 index.')
+    parser.add_argument('--directory', default=DEFAULT_DIRECTORY)
+    commands = parser.add_subparsers(dest='command', required=True)
+    update = commands.add_parser('update', help='index the files that changed')
+    update.add_argument('paths', nargs='*', default=list(DEFAULT_PATHS))
+    update.add_argument('--ratio', type=float, default=RATIO,
+                        help='merge size ratio (default: %(default)s)')
+    update.add_argument('--no-merge', action='store_true')
+    query = commands.add_parser('query', help='print the best chunks for a query')
+    query.add_argument('text')
+    query.add_argument('-k', type=int, default=10)
+    commands.add_parser('status', help='list the segments')
+    merge = commands.add_parser('merge', help='merge segments now')
+    merge.add_argument('--all', action='store_true', help='merge every segment into one')
+    merge.add_argument('--ratio', type=float, default=RATIO)
+    args = parser.parse_args(argv)
+
+    if args.command == 'update':
+        writer = IndexWriter(args.directory, args.ratio)
+        result = writer.update(args.paths, merge=not args.no_merge)
+        if result.segment is None:
+            print(f"up to date ({result.seconds * 1000:.1f} ms)")
+        else:
+            print(f"{result.segment}: {len(result.changed)} changed, {len(result.removed)} "
+                  f"removed, {result.documents} chunks in {result.seconds * 1000:.1f} ms")
+        writer.wait()
+        for done in writer.merges:
+            print(f"{done.segment}: merged {len(done.segments)} segments, {done.documents} "
+                  f"chunks in {done.seconds * 1000:.1f} ms (background)")
+        return 0
+
+    if args.command == 'merge':
+        done = IndexWriter(args.directory, args.ratio).merge(everything=args.all)
+        if done is None:
+            print("nothing to merge")
+        else:
+            print(f"{done.segment}: merged {len(done.segments)} segments, {done.documents} "
+                  f"chunks in {done.seconds * 1000:.1f} ms")
+        return 0
+
+    if args.command == 'status':
+        entries = load_catalog(args.directory)['segments']
+        for entry, live in zip(entries, live_documents(entries)):
+            size = os.path.getsize(os.path.join(args.directory, entry['file']))
+            print(f"{entry['file']}  {live:5d}/{entry['documents']:<5d} live  "
+                  f"{len(entry['ranges']):3d} files  {len(entry['tombstones']):3d} tombstones  "
+                  f"{size} bytes")
+        return 0
+
+    start = time.perf_counter()
+    with SegmentedIndex(args.directory) as index:
+        opened = time.perf_counter()
+        terms = index.analyzer(args.text)
+        results = index.search(terms, args.k)
+        done = time.perf_counter()
+        count = len(index.segments)
+    for doc_id, score in results:
+        print(f"{score:8.3f}  {doc_id}")
+    print(f"open {(opened - start) * 1e3:.2f} ms, query {(done - opened) * 1e6:.0f} us "
+          f"({len(set(terms))} terms, {count} segments)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""Resident converter answering JSON-lines requests.
+
+    python -m mdtex.server                       # requests on stdin, responses on stdout
+    python -m mdtex.server --socket /tmp/mdtex.sock
+
+One request per line, one response per line carrying the request's "id":
+
+    {"id": 1, "profile": "cap4", "markdown": "# Título\\n..."}
+    {"id": 2, "profile": "cap2", "input": "CAPITULO-2.md", "format": "text"}
+    {"id": 3, "profile": "cap2", "input": "CAPITULO-2.md", "output": "CAPITULO-2.tex"}
+    {"id": 4, "op": "stats"}
+
+A conversion answers with "output" (or "written" when an output file was
+given), "timings" in milliseconds and "diagnostics" about Markdown the
+converter could not map cleanly. Failures answer "ok": false and an
+"error". Requests run concurrently on a thread pool, so on stdin
+responses may come back out of order; on a socket each connection is
+served by its own thread. Rules, backends and a block cache stay warm
+for the life of the process.
+"""
+
+import argparse
+import json
+import os
+import signal
+import socketserver
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from . import engine, ir
+from .cache import DEFAULT_MEMORY_ENTRIES, BlockCache
+from .profiles import get_profile
+from .tables import split_row
+
+LATENCY_WINDOW = 10000
+
+
+class _SharedCache:
+    """A BlockCache that request threads can share."""
+
+    def __init__(self, cache):
+        self._cache = cache
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            return self._cache.get(key)
+
+    def put(self, key, lines):
+        with self._lock:
+            self._cache.put(key, lines)
+
+    def flush(self):
+        with self._lock:
+            self._cache.flush()
+
+
+def diagnose(nodes):
+    """Yields warnings about Markdown the converter passed through or padded."""
+    for node in nodes:
+        if isinstance(node, (ir.Table, ir.TableHead)):
+            if len(node.rows) < 3:
+                yield f"table with {len(node.rows)} line(s) is left as text: {node.rows[0][:60]}"
+                continue
+            width = len(split_row(node.rows[0]))
+            for row in node.rows[2:]:
+                cells = len(split_row(row))
+                if cells != width:
+                    yield f"table row has {cells} cells, header has {width}: {row[:60]}"
+        elif isinstance(node, ir.TableRows):
+            width = len(split_row(node.header))
+            for row in node.rows:
+                cells = len(split_row(row))
+                if cells != width:
+                    yield f"table row has {cells} cells, header has {width}: {row[:60]}"
+        elif isinstance(node, (ir.List, ir.Quote)):
+            yield from diagnose(node.children)
+
+
+def percentiles(samples, points=(50, 90, 99)):
+    ordered = sorted(samples)
+    if not ordered:
+        return {}
+    result = {f'p{p}': ordered[min(len(ordered) - 1, len(ordered) * p // 100)] for p in points}
+    result['max'] = ordered[-1]
+    return result
+
+
+class Server:
+    """Dispatches requests; shared by the stdin and socket transports."""
+
+    def __init__(self, workers=None, cache_entries=DEFAULT_MEMORY_ENTRIES):
+        self.cache = _SharedCache(BlockCache(memory_entries=cache_entries))
+        self.pool = ThreadPoolExecutor(workers)
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.requests = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def handle(self, request):
+        """Answers one decoded request."""
+        op = request.get('op', 'convert')
+        if op == 'ping':
+            return {'ok': True}
+        if op == 'stats':
+            return dict(self.stats(), ok=True)
+        if op != 'convert':
+            raise ValueError(f"Unknown op: {op}")
+
+        profile = get_profile(request['profile'])
+        backend = request.get('format', 'latex')
+        start = time.perf_counter()
+        if 'markdown' in request:
+            response = self._convert_lines(engine.split_lines(request['markdown']),
+                                           profile, backend)
+        elif 'output' in request:
+            written = engine.convert_file(request['input'], request['output'], profile,
+                                          self.cache, backend)
+            response = {'written': written, 'diagnostics': []}
+        else:
+            with open(request['input'], 'r', encoding='utf-8') as f:
+                response = self._convert_lines(engine.read_lines(f), profile, backend)
+        response['timings'] = {'convert_ms': (time.perf_counter() - start) * 1000}
+        return response
+
+    def _convert_lines(self, lines, profile, backend):
+        diagnostics = []
+
+        def blocks():
+            for block, nodes in engine.split_blocks(lines, profile):
+                diagnostics.extend(diagnose(nodes))
+                yield engine.block_digest(block), nodes
+
+        output = engine.render_blocks(blocks(), profile, self.cache, backend)
+        return {'output': '\n'.join(output) + '\n', 'diagnostics': diagnostics}
+
+    def handle_line(self, line, received=None):
+        """Answers one JSON line (str or UTF-8 bytes) with one JSON line, unterminated."""
+        received = received or time.perf_counter()
+        request = {}
+        try:
+            if isinstance(line, bytes):
+                line = line.decode('utf-8')
+            request = json.loads(line)
+            response = self.handle(request)
+            response.setdefault('ok', True)
+        except Exception as e:
+            response = {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+        if isinstance(request, dict) and 'id' in request:
+            response['id'] = request['id']
+        latency = (time.perf_counter() - received) * 1000
+        if 'timings' in response:
+            response['timings']['total_ms'] = latency
+        with self._lock:
+            self.requests += 1
+            self.failures += not response['ok']
+            self.latencies.append(latency)
+        return json.dumps(response, ensure_ascii=False)
+
+    def stats(self):
+        with self._lock:
+            samples = list(self.latencies)
+            requests, failures = self.requests, self.failures
+        return {'requests': requests, 'failures': failures,
+                'latency_ms': percentiles(samples)}
+
+    def serve_stdio(self, stdin=sys.stdin, stdout=sys.stdout):
+        write_lock = threading.Lock()
+
+        def answer(line, received):
+            response = self.handle_line(line, received)
+            with write_lock:
+                stdout.write(response + '\n')
+                stdout.flush()
+
+        for line in stdin:
+            if line.strip():
+                self.pool.submit(answer, line, time.perf_counter())
+        self.pool.shutdown()
+
+    def serve_socket(self, path):
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if line.strip():
+                        response = server.handle_line(line)
+                        self.wfile.write(response.encode('utf-8') + b'\n')
+
+        if os.path.exists(path):
+            os.remove(path)
+        with socketserver.ThreadingUnixStreamServer(path, Handler) as unix:
+            unix.daemon_threads = True
+            try:
+                unix.serve_forever()
+            finally:
+                os.remove(path)
+
+    def close(self):
+        self.pool.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m mdtex.server',
+                                     description='Serve conversions over JSON lines.')
+    parser.add_argument('--socket', default=None,
+                        help='listen on this Unix socket instead of stdin/stdout')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='request threads on stdin (default: Python\'s thread pool size)')
+    parser.add_argument('--cache-entries', type=int, default=DEFAULT_MEMORY_ENTRIES,
+                        help='blocks kept in the in-memory cache (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    server = Server(args.workers, args.cache_entries)
+    # Stop cleanly (socket removed, stats printed) when a supervisor terminates us
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        if args.socket:
+            server.serve_socket(args.socket)
+        else:
+            server.serve_stdio()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        print(json.dumps(server.stats()), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""Content hashes that let a rebuild skip documents that cannot have changed.
+
+A job is up to date when the hashes of its Markdown input, of its profile
+and of the engine match the ones recorded after its last successful build,
+and its output still holds the LaTeX that build produced.
+"""
+
+import json
+import os
+
+from .fingerprint import digest_file, engine_version, profile_digest
+
+STATE_FILE = '.mdtex-state.json'
+
+
+class BuildState:
+    """Per-job hashes persisted next to the manifest."""
+
+    def __init__(self, path, jobs=None):
+        self.path = path
+        self.jobs = jobs or {}
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(path)
+        return cls(path, data.get('jobs', {}))
+
+    def save(self):
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'jobs': self.jobs}, f, indent=2, sort_keys=True)
+            f.write('\n')
+        os.replace(tmp, self.path)
+
+    @staticmethod
+    def key(job):
+        return os.path.basename(job.input)
+
+    @staticmethod
+    def fingerprint(job, labels=None):
+        fingerprint = {
+            'input': digest_file(job.input),
+            'profile': profile_digest(job.profile),
+            'engine': engine_version(),
+        }
+        if labels is not None:
+            # Labels depend on the other documents too (see mdtex.labels)
+            fingerprint['labels'] = labels.digest()
+        return fingerprint
+
+    def is_fresh(self, job, fingerprint):
+        record = self.jobs.get(self.key(job))
+        if not record or fingerprint['input'] is None:
+            return False
+        if any(record.get(k) != v for k, v in fingerprint.items()):
+            return False
+        return record.get('output') == digest_file(job.output)
+
+    def record(self, job, fingerprint):
+        self.jobs[self.key(job)] = dict(fingerprint, output=digest_file(job.output))
@@ -0,0 +1,94 @@
+"""Unicode symbols and emoji to LaTeX, in one scan.
+
+make_transliterator() compiles a profile's symbol map (and the Markdown
+checkboxes) into a single pattern, so a text is scanned once however many
+symbols there are. In strict mode an emoji the map does not cover raises
+UnmappedSymbolError, as pdflatex would fail on it much later and much more
+slowly; mdtex.audit finds such characters across the corpus.
+"""
+
+import re
+import unicodedata
+
+VARIATION_SELECTOR = '\ufe0f'  # emoji presentation; dropped with the symbol
+
+# Pictographs pdflatex has no glyph for
+EMOJI_RE = re.compile('[\u2600-\u27bf\u2b00-\u2bff\U0001f000-\U0001faff]')
+
+CHECKBOXES = (
+    ('[x]', r'\textbf{[x]}'),
+    ('[ ]', r'\textbf{[ ]}'),
+)
+
+
+class UnmappedSymbolError(ValueError):
+    """An emoji with no LaTeX replacement in the profile's symbol map."""
+
+    def __init__(self, symbol, text):
+        self.symbol = symbol
+        name = unicodedata.name(symbol, 'unnamed')
+        super().__init__(f"unmapped symbol U+{ord(symbol):04X} {name} in {text[:60]!r}")
+
+
+def _latin1(text):
+    try:
+        text.encode('latin-1')
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+def make_transliterator(symbols=(), checkboxes=False, strict=False):
+    """Returns a function replacing symbols, given as (text, LaTeX) pairs.
+
+    Symbols of one character, the emoji among them, go through a single
+    str.translate() scan whatever their number; a variation selector
+    after one of them goes with it, so '⚠' and '⚠️' are the same symbol.
+    Longer symbols such as the checkboxes are replaced first. With strict,
+    an emoji left over raises UnmappedSymbolError. Returns None when there
+    is nothing to replace or check.
+    """
+    table = {}
+    for symbol, replacement in (CHECKBOXES if checkboxes else ()) + tuple(symbols):
+        table.setdefault(symbol.rstrip(VARIATION_SELECTOR), replacement)
+    if not table and not strict:
+        return None
+
+    chars = {ord(symbol): replacement for symbol, replacement in table.items()
+             if len(symbol) == 1}
+    longer = sorted(((symbol, replacement) for symbol, replacement in table.items()
+                     if len(symbol) > 1), key=lambda pair: -len(pair[0]))
+
+    # Most non-ASCII text is accented letters only, which no symbol (when
+    # none is in Latin-1) can be part of; str.encode() tells in one C scan.
+    # Other text is searched for the first symbol before translating; the
+    # emoji ranges make a much faster pattern than a class of every symbol.
+    skip_latin1 = all(c > 0xff for c in chars)
+    if all(EMOJI_RE.match(chr(c)) for c in chars):
+        trigger = EMOJI_RE
+    else:
+        trigger = re.compile('[' + ''.join(re.escape(chr(c)) for c in chars)
+                             + (EMOJI_RE.pattern[1:-1] if strict else '') + ']')
+    # A selector goes with the mapped symbol before it; others stay, for
+    # mdtex.audit to report
+    selected = chars and re.compile(
+        '([' + ''.join(re.escape(chr(c)) for c in chars) + '])' + VARIATION_SELECTOR)
+
+    def transliterate(text):
+        for symbol, replacement in longer:
+            if symbol in text:
+                text = text.replace(symbol, replacement)
+        if text.isascii() or skip_latin1 and _latin1(text) or not trigger.search(text):
+            return text
+        if chars:
+            if VARIATION_SELECTOR in text:
+                text = selected.sub(r'\1', text)
+            text = text.translate(chars)
+        if strict:
+            match = EMOJI_RE.search(text)
+            if match:
+                raise UnmappedSymbolError(match.group(), text)
+        return text
+
+    transliterate.symbols = frozenset(table)
+    return transliterate
@@ -0,0 +1,231 @@
+import json
+import os
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+from .columns import ColumnPlanner
+from .keywords import KeywordMatcher
+from .latex import escape_latex
+
+RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'table_rules.json')
+
+
+@dataclass(frozen=True)
+class TableRule:
+    """Caption, label and column spec for tables whose header mentions all keywords.
+
+    Where several rules match, the one with the highest priority wins,
+    then the one listed first.
+    """
+    keywords: tuple
+    column_spec: str = None
+    caption: str = None
+    label: str = None
+    priority: int = 0
+
+
+@dataclass(frozen=True)
+class TableStyle:
+    placement: str = 'H'
+    environment: str = 'tabular'
+    small: bool = True
+    # Called with the number of columns and the table's raw cells (header
+    # row first; None when there are none to look at), see
+    # mdtex.columns.ColumnPlanner
+    column_spec: object = ColumnPlanner(ruled=False)
+    drop_empty_headers: bool = False
+    trim_rows: bool = False
+    caption: str = None
+    label: str = None
+    rules: tuple = field(default_factory=tuple)
+
+
+def split_row(line):
+    return [cell.strip() for cell in line.strip().strip('|').split('|')]
+
+
+@lru_cache(maxsize=None)
+def load_rules(path=RULES_FILE):
+    """TableRules by profile name, from a JSON file of rule objects."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return {name: tuple(TableRule(**dict(rule, keywords=tuple(rule['keywords'])))
+                        for rule in rules)
+            for name, rules in data.items()}
+
+
+class _Classifier:
+    """The rules of a style compiled into one keyword matcher."""
+
+    def __init__(self, rules):
+        keywords = sorted({keyword for rule in rules for keyword in rule.keywords})
+        self.matcher = KeywordMatcher(keywords)
+        index = {keyword: i for i, keyword in enumerate(keywords)}
+        # Best rules first, so the first one satisfied wins
+        order = sorted(range(len(rules)), key=lambda i: (-rules[i].priority, i))
+        self.rules = [(rules[i], frozenset(index[k] for k in rules[i].keywords))
+                      for i in order]
+
+    def classify(self, header_text):
+        found = self.matcher.find(header_text)
+        for rule, needed in self.rules:
+            if needed <= found:
+                return rule
+        return None
+
+
+@lru_cache(maxsize=None)
+def _classifier(rules):
+    return _Classifier(rules)
+
+
+def classify(style, header_text):
+    """Returns the best rule matching the lowercased header text, if any.
+
+    The header is scanned once for the keywords of every rule.
+    """
+    return _classifier(style.rules).classify(header_text)
+
+
+def _pad(row, num_cols, style):
+    if len(row) < num_cols:
+        row += [''] * (num_cols - len(row))
+    return row[:num_cols] if style.trim_rows else row
+
+
+def _caption_label(headers, style, caption_info):
+    # The Markdown caption, else the matching rule's, else the style's
+    rule = classify(style, ''.join(headers).lower()) if style.rules else None
+    if caption_info:
+        return rule, escape_latex(caption_info.text), escape_latex(caption_info.label)
+    if rule:
+        return rule, rule.caption, rule.label
+    return rule, style.caption, style.label
+
+
+def _layout(headers, style, caption_info, cells=None):
+    """Column spec, caption and label of a table with these headers."""
+    rule, caption, label = _caption_label(headers, style, caption_info)
+    col_spec = rule.column_spec if rule else None
+    if col_spec is None:
+        col_spec = style.column_spec(len(headers), cells)
+    return col_spec, caption, label
+
+
+def table_label(table_lines, style, fmt_batch, caption_info=None):
+    """The label render_table() or render_long_table_head() gives a table, if any."""
+    if len(table_lines) < 3:
+        return None
+    return _caption_label(_headers(table_lines[0], style, fmt_batch), style, caption_info)[2]
+
+
+def _keep_headers(raw, headers, style):
+    # Raw and formatted header cells, without the empty ones if the style drops them
+    if style.drop_empty_headers:
+        raw = [cell for cell, h in zip(raw, headers) if h]
+        headers = [h for h in headers if h]
+    return raw, headers
+
+
+def _headers(header_line, style, fmt_batch):
+    raw = split_row(header_line)
+    return _keep_headers(raw, fmt_batch(raw), style)[1]
+
+
+def render_table(table_lines, style, fmt_batch, caption_info=None):
+    """Converts buffered Markdown table lines to a LaTeX table float."""
+    if len(table_lines) < 3:
+        return '\n'.join(table_lines)  # Not a valid table
+
+    # Format the header and every body cell in a single batch
+    # (table_lines[1] is the separator line)
+    split = [split_row(table_lines[0])]
+    split.extend(split_row(line) for line in table_lines[2:])
+    cells = iter(fmt_batch([cell for row in split for cell in row]))
+    headers, *body = [[next(cells) for _ in row] for row in split]
+
+    # The column planner sees the header row as it is rendered
+    split[0], headers = _keep_headers(split[0], headers, style)
+    num_cols = len(headers)
+    rows = [_pad(row, num_cols, style) for row in body]
+    col_spec, caption, label = _layout(headers, style, caption_info, split)
+
+    latex = [r"\begin{table}[" + style.placement + "]", r"\centering"]
+    if style.small:
+        latex.append(r"\small")
+    if style.environment == 'tabularx':
+        latex.append(r"\begin{tabularx}{\textwidth}{" + col_spec + "}")
+    else:
+        latex.append(r"\begin{" + style.environment + "}{" + col_spec + "}")
+    latex.append(r"\hline")
+
+    latex.append(" & ".join([r"\textbf{" + h + "}" for h in headers]) + r" \\")
+    latex.append(r"\hline")
+    for row in rows:
+        latex.append(" & ".join(row) + r" \\")
+        latex.append(r"\hline")
+
+    latex.append(r"\end{" + style.environment + "}")
+    if caption:
+        latex.append(r"\caption{" + caption + "}")
+    if label:
+        latex.append(r"\label{" + label + "}")
+    latex.append(r"\end{table}")
+
+    return "\n".join(latex)
+
+
+# Long tables are not floats: they break across pages and repeat their
+# header on each one. Rows are rendered in chunks as the parser hands them
+# on (see ir.TableHead), so a table of any length is never held whole.
+
+def long_environment(style):
+    """xltabular for tabularx styles (X columns), longtable otherwise."""
+    return 'xltabular' if style.environment == 'tabularx' else 'longtable'
+
+
+def render_long_table_head(table_lines, style, fmt_batch, caption_info=None):
+    """Opens a longtable/xltabular with its header and first rows.
+
+    Columns are laid out from these rows, the first ones of the table.
+    """
+    raw = split_row(table_lines[0])
+    raw, headers = _keep_headers(raw, fmt_batch(raw), style)
+    cells = [raw]
+    cells.extend(split_row(line) for line in table_lines[2:])
+    col_spec, caption, label = _layout(headers, style, caption_info, cells)
+    environment = long_environment(style)
+    header = " & ".join([r"\textbf{" + h + "}" for h in headers]) + r" \\"
+
+    latex = [r"\begingroup\small"] if style.small else []
+    if environment == 'xltabular':
+        latex.append(r"\begin{xltabular}{\textwidth}{" + col_spec + "}")
+    else:
+        latex.append(r"\begin{longtable}{" + col_spec + "}")
+    if caption or label:
+        latex.append((r"\caption{" + caption + "}" if caption else "")
+                     + (r"\label{" + label + "}" if label else "") + r" \\")
+        latex.extend([r"\hline", header, r"\hline", r"\endfirsthead"])
+    latex.extend([r"\hline", header, r"\hline", r"\endhead"])
+    if len(table_lines) > 2:
+        latex.append(render_long_table_rows(table_lines[0], table_lines[2:], style, fmt_batch))
+    return "\n".join(latex)
+
+
+def render_long_table_rows(header_line, rows, style, fmt_batch):
+    """Body rows of a long table, laid out by its header line."""
+    num_cols = len(_headers(header_line, style, fmt_batch))
+    split = [split_row(line) for line in rows]
+    cells = iter(fmt_batch([cell for row in split for cell in row]))
+    latex = []
+    for row in split:
+        latex.append(" & ".join(_pad([next(cells) for _ in row], num_cols, style)) + r" \\")
+        latex.append(r"\hline")
+    return "\n".join(latex)
+
+
+def render_long_table_end(style):
+    latex = [r"\end{" + long_environment(style) + "}"]
+    if style.small:
+        latex.append(r"\endgroup")
+    return "\n".join(latex)
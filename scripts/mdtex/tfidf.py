@@ -0,0 +1,181 @@
+"""Sparse TF-IDF matrix of the retrieval chunks, queried in batches.
+
+    python -m mdtex.tfidf 'qué es un interesado' 'ruta crítica' -k 3
+    python -m mdtex.tfidf --file preguntas.txt -k 5 --quiet
+
+The chunk-term matrix is kept column by column (compressed sparse
+columns) in flat arrays. Weights are sublinear, 1 + log(tf), times the
+smoothed idf, and every chunk's row is scaled to unit length, so a
+query's scores are cosine similarities.
+
+search_batch() scores many queries in one product of the query matrix
+with the chunk matrix: the queries' distinct terms are gathered first and
+each term's column is read once for all the queries that contain it, into
+one sparse accumulator per query, holding only the chunks its terms reach;
+repeated queries are scored once. The top k of an accumulator come from a
+heap. Each call reports its throughput in queries/s.
+"""
+
+import argparse
+import heapq
+import math
+import sys
+import time
+from array import array
+from collections import namedtuple
+
+from .analyzer import ANALYZER
+from .bm25 import DEFAULT_CHUNKS, chunk_text
+from .chunks import read_chunks
+
+# Queries scored together; bounds the accumulators held at once
+BATCH_SIZE = 256
+
+BatchResult = namedtuple('BatchResult', 'results seconds rate')
+
+
+def _weight(tf):
+    return 1.0 + math.log(tf)
+
+
+class TfidfMatrix:
+    """Chunk-term TF-IDF weights in compressed sparse column arrays."""
+
+    def __init__(self, ids, vocabulary, idf, starts, rows, values, analyzer=ANALYZER):
+        self.ids = ids  # chunk id of each row
+        self.vocabulary = vocabulary  # term -> column
+        self.idf = idf  # array('d'), per column
+        self.starts = starts  # array('I'): column c is rows/values[starts[c]:starts[c + 1]]
+        self.rows = rows  # array('I')
+        self.values = values  # array('d')
+        self.analyzer = analyzer  # made the terms; analyzes the queries too
+
+    @classmethod
+    def from_documents(cls, documents, analyzer=ANALYZER):
+        """Builds the matrix of (id, terms) pairs made by analyzer."""
+        ids = []
+        counts = []
+        df = {}
+        for doc_id, terms in documents:
+            ids.append(doc_id)
+            tf = {}
+            for term in terms:
+                tf[term] = tf.get(term, 0) + 1
+            counts.append(tf)
+            for term in tf:
+                df[term] = df.get(term, 0) + 1
+
+        n = len(ids)
+        vocabulary = {term: column for column, term in enumerate(sorted(df))}
+        idf = array('d', (math.log((1 + n) / (1 + df[term])) + 1 for term in sorted(df)))
+        columns = [[] for _ in vocabulary]
+        for row, tf in enumerate(counts):
+            weights = [(vocabulary[term], _weight(f) * idf[vocabulary[term]])
+                       for term, f in tf.items()]
+            norm = math.sqrt(sum(w * w for _, w in weights)) or 1.0
+            for column, w in weights:
+                columns[column].append((row, w / norm))
+
+        starts = array('I', [0])
+        rows = array('I')
+        values = array('d')
+        for entries in columns:
+            rows.extend(row for row, _ in entries)
+            values.extend(value for _, value in entries)
+            starts.append(len(rows))
+        return cls(ids, vocabulary, idf, starts, rows, values, analyzer)
+
+    @classmethod
+    def from_chunks(cls, path=DEFAULT_CHUNKS, analyzer=ANALYZER):
+        """Builds the matrix of a chunks.jsonl file (see mdtex.chunks)."""
+        return cls.from_documents(((chunk.id, analyzer(chunk_text(chunk)))
+                                   for chunk in read_chunks(path)), analyzer)
+
+    def vector(self, terms):
+        """The unit-length query vector of terms, as {column: weight}."""
+        tf = {}
+        for term in terms:
+            column = self.vocabulary.get(term)
+            if column is not None:
+                tf[column] = tf.get(column, 0) + 1
+        weights = {column: _weight(f) * self.idf[column] for column, f in tf.items()}
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        return {column: w / norm for column, w in weights.items()}
+
+    def search(self, terms, k=10):
+        """The k best (chunk id, cosine) pairs for one query, best first."""
+        return self.search_batch([terms], k).results[0]
+
+    def search_batch(self, queries, k=10, batch_size=BATCH_SIZE):
+        """Top k (chunk id, cosine) pairs of each query's terms, in query order."""
+        start = time.perf_counter()
+        # Repeated queries are scored once
+        vectors = {}
+        slots = [vectors.setdefault(tuple(sorted(self.vector(terms).items())), len(vectors))
+                 for terms in queries]
+        vectors = list(vectors)
+        top = []
+        for first in range(0, len(vectors), batch_size):
+            top.extend(self._batch(vectors[first:first + batch_size], k))
+        results = [top[slot] for slot in slots]
+        seconds = time.perf_counter() - start
+        return BatchResult(results, seconds, len(queries) / seconds if seconds else float('inf'))
+
+    def _batch(self, vectors, k):
+        # The query matrix by column: column -> [(query, weight), ...]
+        by_column = {}
+        for q, vector in enumerate(vectors):
+            for column, weight in vector:
+                by_column.setdefault(column, []).append((q, weight))
+
+        accumulators = [{} for _ in vectors]  # row -> score, of the rows a term reached
+        for column, weighted in by_column.items():
+            start, end = self.starts[column], self.starts[column + 1]
+            rows, values = self.rows[start:end], self.values[start:end]
+            for q, weight in weighted:
+                scores = accumulators[q]
+                get = scores.get
+                for row, value in zip(rows, values):
+                    scores[row] = get(row, 0.0) + weight * value
+        return [self._top(scores, k) for scores in accumulators]
+
+    def _top(self, scores, k):
+        # Ties go to the earlier row
+        best = heapq.nlargest(k, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [(self.ids[row], score) for row, score in best if score > 0.0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m mdtex.tfidf',
+                                     description='Rank chunks for queries by TF-IDF cosine.')
+    parser.add_argument('queries', nargs='*')
+    parser.add_argument('--file', help='more queries, one per line')
+    parser.add_argument('--chunks', default=DEFAULT_CHUNKS)
+    parser.add_argument('-k', type=int, default=5)
+    parser.add_argument('--quiet', action='store_true', help='print the throughput only')
+    args = parser.parse_args(argv)
+
+    queries = list(args.queries)
+    if args.file:
+        with open(args.file, 'r', encoding='utf-8') as f:
+            queries.extend(line.strip() for line in f if line.strip())
+    if not queries:
+        parser.error('no queries')
+
+    start = time.perf_counter()
+    matrix = TfidfMatrix.from_chunks(args.chunks)
+    built = time.perf_counter() - start
+    batch = matrix.search_batch([matrix.analyzer(query) for query in queries], args.k)
+    if not args.quiet:
+        for query, results in zip(queries, batch.results):
+            print(query)
+            for doc_id, score in results:
+                print(f"  {score:.3f}  {doc_id}")
+    print(f"{len(matrix.ids)} chunks x {len(matrix.vocabulary)} terms built in "
+          f"{built * 1000:.1f} ms; {len(queries)} queries in {batch.seconds * 1000:.1f} ms "
+          f"({batch.rate:,.0f} queries/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+"""Re-converts informe_final documents as they are saved.
+
+    python -m mdtex.watch                 # every manifest job
+    python -m mdtex.watch cap4 ANEXO-C    # selected jobs
+    python -m mdtex.watch --poll          # stat polling instead of inotify
+
+Brings every selected job up to date once, then waits for its Markdown
+inputs to change. Bursts of events (editors often write a file several
+times per save) are debounced and only the jobs whose input changed are
+converted, in this process, with the compiled rules, the caches and each
+document's labels kept warm between saves. Events for other files, such as
+the LaTeX the build writes next to the inputs, are ignored.
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+from . import build
+from .cache import BlockCache
+from .parsecache import ParseCache
+
+DEFAULT_DEBOUNCE = 0.05
+DEFAULT_POLL_INTERVAL = 0.25
+
+# inotify(7)
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct('iIII')  # wd, mask, cookie, len
+
+
+class InotifyWatcher:
+    """Names of files changed in one directory, from Linux inotify."""
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError("inotify is not available")
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_MODIFY
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"cannot watch {directory}")
+
+    def wait(self, timeout=None):
+        """Returns the set of names changed within timeout seconds (None: block)."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        data = os.read(self.fd, 64 * 1024)
+        names = set()
+        offset = 0
+        while offset < len(data):
+            _, _, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if name:
+                names.add(os.fsdecode(name))
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Names of files changed in one directory, by comparing stat results."""
+
+    def __init__(self, directory, interval=DEFAULT_POLL_INTERVAL):
+        self.directory = directory
+        self.interval = interval
+        self.seen = self._scan()
+
+    def _scan(self):
+        seen = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    st = entry.stat()
+                    seen[entry.name] = (st.st_mtime_ns, st.st_size)
+        return seen
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            current = self._scan()
+            names = {name for name, stat in current.items() if self.seen.get(name) != stat}
+            self.seen = current
+            if names:
+                return names
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            pause = self.interval
+            if deadline is not None:
+                pause = max(0.0, min(pause, deadline - time.monotonic()))
+            time.sleep(pause)
+
+    def close(self):
+        pass
+
+
+def open_watcher(directory, poll=False):
+    """inotify where the platform has it, stat polling otherwise."""
+    if not poll and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(directory)
+        except OSError:
+            pass
+    return PollingWatcher(directory)
+
+
+def watch(jobs, state=None, cache=None, debounce=DEFAULT_DEBOUNCE, poll=False,
+          out=sys.stdout, report=None, parsed=None):
+    """Converts jobs whenever their inputs change, until interrupted.
+
+    Labels are indexed over the report's jobs (default: jobs) after every
+    change, parsing only the changed documents again, and documents whose
+    labels it changed are converted too. parsed is an optional parse cache
+    directory.
+    """
+    by_directory = {}
+    for job in jobs:
+        by_directory.setdefault(os.path.dirname(job.input), {})[os.path.basename(job.input)] = job
+    if len(by_directory) != 1:
+        raise ValueError("watched inputs must share one directory")
+    (directory, by_name), = by_directory.items()
+    # Report documents next to the watched ones change labels too
+    inputs = by_name.keys() | {os.path.basename(job.input) for job in report or ()
+                               if os.path.dirname(job.input) == directory}
+
+    blocks = BlockCache(*cache) if cache else None
+    parse_cache = ParseCache(parsed) if parsed else None
+    memo = {}  # input path -> (source hash, profile, labels)
+    watcher = open_watcher(directory, poll)
+    try:
+        start = time.perf_counter()
+        registry = build.index_labels(report or jobs, parse_cache, memo)
+        results = build.build(jobs, 1, state, cache=cache, parsed=parsed, registry=registry)
+        build.print_summary(results, time.perf_counter() - start, out)
+        print(f"Watching {directory} ({type(watcher).__name__}); Ctrl-C to stop", file=out,
+              flush=True)
+        while True:
+            names = watcher.wait() & inputs
+            if not names:
+                continue
+            first = time.perf_counter()
+            # Debounce: wait until the burst of events has settled
+            while True:
+                more = watcher.wait(debounce)
+                if not more:
+                    break
+                names |= more & inputs
+            previous, registry = registry, build.index_labels(report or jobs, parse_cache, memo)
+            for name, job in sorted(by_name.items()):
+                labels = registry.document(name)
+                if name in names or labels.digest() != previous.document(name).digest():
+                    _convert(job, state, blocks, parse_cache, first, out, labels)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        if blocks is not None:
+            blocks.close()
+
+
+def _convert(job, state, blocks, parsed, first, out, labels=None):
+    fingerprint = state.fingerprint(job, labels) if state else None
+    if fingerprint and state.is_fresh(job, fingerprint):
+        return
+    result = build.convert_job(job, blocks, parsed, labels=labels)
+    if blocks is not None:
+        blocks.flush()
+    if state is not None and not result.error:
+        state.record(job, fingerprint)
+        state.save()
+    latency = time.perf_counter() - first
+    status = f"FAILED {result.error}" if result.error else result.status
+    print(f"  {os.path.basename(job.input)}  {job.profile}  {result.seconds * 1000:.1f} ms "
+          f"({latency * 1000:.1f} ms after the save)  {status}", file=out, flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m mdtex.watch',
+                                     description='Re-convert informe_final documents on save.')
+    build.add_build_arguments(parser)
+    parser.add_argument('--debounce', type=float, default=DEFAULT_DEBOUNCE,
+                        help='seconds without events before converting (default: %(default)s)')
+    parser.add_argument('--poll', action='store_true',
+                        help='poll file stats instead of using inotify')
+    args = parser.parse_args(argv)
+    jobs, state, cache, parsed = build.load_settings(parser, args)
+    try:
+        watch(jobs, state, cache, args.debounce, args.poll,
+              report=build.load_manifest(args.manifest), parsed=parsed)
+    except ValueError as e:
+        parser.error(str(e))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""Tests for mdtex.server; run from scripts/ with python -m unittest discover tests."""
+
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+
+from mdtex.server import Server
+
+
+class HandleLineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = Server(workers=1)
+
+    def tearDown(self):
+        self.server.close()
+
+    def test_invalid_utf8_is_an_error_response(self):
+        response = json.loads(self.server.handle_line(b'{"id": 1, "markdown": "\xff"}\n'))
+        self.assertFalse(response['ok'])
+        self.assertIn('UnicodeDecodeError', response['error'])
+        self.assertEqual(self.server.failures, 1)
+
+    def test_bytes_and_str_lines(self):
+        for line in (b'{"id": 7, "op": "ping"}\n', '{"id": 7, "op": "ping"}\n'):
+            self.assertEqual(json.loads(self.server.handle_line(line)), {'ok': True, 'id': 7})
+
+
+class SocketTest(unittest.TestCase):
+
+    def test_connection_survives_invalid_utf8(self):
+        server = Server(workers=1)
+        self.addCleanup(server.close)
+        path = os.path.join(tempfile.mkdtemp(), 'mdtex.sock')
+        threading.Thread(target=server.serve_socket, args=(path,), daemon=True).start()
+        deadline = time.monotonic() + 5
+        while not os.path.exists(path):
+            self.assertLess(time.monotonic(), deadline, 'socket not created')
+            time.sleep(0.01)
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(path)
+            client.sendall(b'{"id": 1, "markdown": "\xff"}\n{"id": 2, "op": "ping"}\n')
+            with client.makefile('rb') as replies:
+                first = json.loads(replies.readline())
+                second = json.loads(replies.readline())
+        self.assertFalse(first['ok'])  # no id: the line could not be decoded
+        self.assertEqual(second, {'ok': True, 'id': 2})
+
+
+if __name__ == '__main__':
+    unittest.main()